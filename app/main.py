@@ -18,30 +18,207 @@ Environment Variables:
     UPSTREAM_PORT: Port for the llama.cpp server (default: 8081)
     UPSTREAM_HOST: Host for the llama.cpp server (default: 127.0.0.1)
     LLAMA_CPP_ARGS: Additional arguments for llama-server
+    WEB_CONCURRENCY: Number of uvicorn worker processes (default: 1)
+    LLAMA_SERVER_LOCK: Lock file electing the worker that spawns llama-server
+        (default: /tmp/llama-server.lock)
+    UPSTREAM_READY_TIMEOUT: Seconds a worker waits for llama-server to accept
+        connections (default: 3600)
+    RESPONSE_CACHE_SIZE: Number of idempotent upstream responses cached per
+        worker; 0 disables caching (default: 0)
+    WARMUP: Set to 1 to send a one-token completion to llama-server at startup
+    LLAMA_SLOTS: Set to 1 to enable llama-server slot saving, KV cache reuse
+        and continuous batching across parallel slots
+    LLAMA_PARALLEL: Number of llama-server slots when LLAMA_SLOTS=1 (default: 4)
+    LLAMA_SLOT_SAVE_PATH: Directory for saved slot state (default: /tmp/slots)
 """
 
 import asyncio
+import fcntl
+import hashlib
 import json
 import os
 import shlex
 import shutil
 import signal
-import subprocess
-from typing import Any, Dict, List, Optional
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import IO, Any, Dict, List, NamedTuple, Optional, Set, Tuple
 
 import httpx
-import psutil
+import orjson
 from fastapi import FastAPI, HTTPException, Request, Response
-from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
 from app.model_manager import prepare_model_and_get_path
 
-APP_PORT = int(os.getenv("PORT", "8080"))
-UPSTREAM_PORT = int(os.getenv("UPSTREAM_PORT", "8081"))
-UPSTREAM_HOST = os.getenv("UPSTREAM_HOST", "127.0.0.1")
+
+class Config(NamedTuple):
+    """Settings read from the environment variables listed above."""
+
+    APP_PORT: int
+    UPSTREAM_PORT: int
+    UPSTREAM_HOST: str
+    LLAMA_SERVER_LOCK: str
+    UPSTREAM_READY_TIMEOUT: float
+    RESPONSE_CACHE_SIZE: int
+    WARMUP: bool
+    LLAMA_SLOTS: bool
+    LLAMA_PARALLEL: int
+    LLAMA_SLOT_SAVE_PATH: str
+
+
+def _load_config() -> Config:
+    """
+    Read the application settings from the environment.
+
+    Returns:
+        Config: Current settings, with defaults for unset variables
+    """
+    return Config(
+        APP_PORT=int(os.getenv("PORT", "8080")),
+        UPSTREAM_PORT=int(os.getenv("UPSTREAM_PORT", "8081")),
+        UPSTREAM_HOST=os.getenv("UPSTREAM_HOST", "127.0.0.1"),
+        LLAMA_SERVER_LOCK=os.getenv("LLAMA_SERVER_LOCK", "/tmp/llama-server.lock"),
+        UPSTREAM_READY_TIMEOUT=float(os.getenv("UPSTREAM_READY_TIMEOUT", "3600")),
+        RESPONSE_CACHE_SIZE=int(os.getenv("RESPONSE_CACHE_SIZE", "0")),
+        WARMUP=os.getenv("WARMUP", "0") == "1",
+        LLAMA_SLOTS=os.getenv("LLAMA_SLOTS", "0") == "1",
+        LLAMA_PARALLEL=int(os.getenv("LLAMA_PARALLEL", "4")),
+        LLAMA_SLOT_SAVE_PATH=os.getenv("LLAMA_SLOT_SAVE_PATH", "/tmp/slots"),
+    )
+
+
+_config = _load_config()
+APP_PORT = _config.APP_PORT
+UPSTREAM_PORT = _config.UPSTREAM_PORT
+UPSTREAM_HOST = _config.UPSTREAM_HOST
+LLAMA_SERVER_LOCK = _config.LLAMA_SERVER_LOCK
+UPSTREAM_READY_TIMEOUT = _config.UPSTREAM_READY_TIMEOUT
+RESPONSE_CACHE_SIZE = _config.RESPONSE_CACHE_SIZE
+WARMUP = _config.WARMUP
+LLAMA_SLOTS = _config.LLAMA_SLOTS
+LLAMA_PARALLEL = _config.LLAMA_PARALLEL
+LLAMA_SLOT_SAVE_PATH = _config.LLAMA_SLOT_SAVE_PATH
+
+# Longest llama-server log line relayed; longer lines are dropped so the log
+# reader keeps draining the pipe
+LOG_LINE_LIMIT = 1024 * 1024
+
+# llama-server log lines buffered between the pipe reader and stdout writer;
+# lines are dropped when full so a slow stdout never stalls llama-server
+LOG_QUEUE_SIZE = 4096
+
+# Maximum number of log lines written to stdout in a single write
+LOG_BATCH_LINES = 64
+
+# Passthrough endpoints whose JSON body is decoded and validated
+_VALIDATED_PATHS = ("chat/completions", "completions")
 
 # Global process handle
-llama_proc: Optional[subprocess.Popen] = None
+llama_proc: Optional[asyncio.subprocess.Process] = None
+
+# Lock held by the worker that owns llama-server (None in other workers)
+spawn_lock: Optional[IO[str]] = None
+
+# Log pump tasks for llama-server; the event loop only keeps weak references
+_log_tasks: Set["asyncio.Task[None]"] = set()
+
+# LRU of upstream responses (status, headers, body) keyed by _cache_key()
+_response_cache: "OrderedDict[str, Tuple[int, Dict[str, str], bytes]]" = OrderedDict()
+
+
+def _try_acquire_spawn_lock() -> Optional[IO[str]]:
+    """
+    Try to become the worker responsible for spawning llama-server.
+
+    Returns:
+        Open lock file holding an exclusive flock, or None if another worker
+        already owns llama-server
+    """
+    lock_file = open(LLAMA_SERVER_LOCK, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+async def _upstream_accepts_connections() -> bool:
+    """
+    Check whether something is listening on the llama.cpp server address.
+
+    Returns:
+        True if a TCP connection to the upstream server succeeds
+    """
+    try:
+        _, writer = await asyncio.open_connection(UPSTREAM_HOST, UPSTREAM_PORT)
+    except OSError:
+        return False
+    writer.close()
+    await writer.wait_closed()
+    return True
+
+
+async def _wait_for_upstream(timeout: float, interval: float = 0.1) -> None:
+    """
+    Wait until the llama.cpp server accepts TCP connections.
+
+    Args:
+        timeout: Maximum number of seconds to wait
+        interval: Delay between connection attempts in seconds
+
+    Raises:
+        RuntimeError: If the upstream server is not reachable before the timeout,
+            or if the llama-server process spawned by this worker exits
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        if llama_proc and llama_proc.returncode is not None:
+            raise RuntimeError(
+                f"llama-server exited with code {llama_proc.returncode} during startup"
+            )
+        if await _upstream_accepts_connections():
+            return
+        if loop.time() >= deadline:
+            raise RuntimeError(
+                f"llama-server not reachable on {UPSTREAM_HOST}:{UPSTREAM_PORT} "
+                f"after {timeout:.0f}s"
+            )
+        await asyncio.sleep(interval)
+
+
+async def _warmup_llama_server(
+    client: httpx.AsyncClient, timeout: float = 120.0
+) -> None:
+    """
+    Send a one-token completion so the first real request hits warm caches.
+
+    This faults in the memory-mapped weights and allocates the KV cache and
+    compute graphs ahead of traffic. Failures are logged and ignored.
+
+    Args:
+        client: Upstream HTTP client
+        timeout: Maximum number of seconds to spend on the warmup
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    payload = {"prompt": " ", "max_tokens": 1, "temperature": 0}
+    try:
+        while True:
+            r = await client.post("/v1/completions", json=payload, timeout=timeout)
+            # llama-server answers 503 until the model is loaded
+            if r.status_code != 503 or loop.time() >= deadline:
+                break
+            await asyncio.sleep(0.5)
+        print(f"Warmup request completed with status {r.status_code}")
+    except Exception as e:
+        print(f"WARNING: Warmup request failed: {e}")
+
 
 from contextlib import asynccontextmanager
 
@@ -51,7 +228,10 @@ async def lifespan(app: FastAPI):
     """
     FastAPI lifespan manager for application startup and shutdown.
 
-    Handles model preparation and llama-server process lifecycle.
+    Handles model preparation and llama-server process lifecycle. When running
+    with several uvicorn workers, only the worker holding the spawn lock
+    prepares the model and starts llama-server; the others wait for it to
+    accept connections.
 
     Args:
         app: FastAPI application instance
@@ -60,34 +240,121 @@ async def lifespan(app: FastAPI):
         None: Application runs during yield
 
     Note:
-        On startup: Prepares model and spawns llama-server
-        On shutdown: Terminates llama-server process and all child processes
+        On startup: Prepares model, spawns llama-server, waits for it to accept
+        connections and opens the shared upstream HTTP client
+        On shutdown: Closes the upstream HTTP client and terminates llama-server
+        process and all child processes
     """
     # Startup
-    model_path = await asyncio.get_event_loop().run_in_executor(
-        None, prepare_model_and_get_path
+    global llama_proc, spawn_lock
+    spawn_lock = _try_acquire_spawn_lock()
+    if spawn_lock and await _upstream_accepts_connections():
+        # llama-server leads its own process group, so it outlives a worker
+        # that dies; adopt it rather than clash with it on the same port
+        print(
+            f"Reusing llama-server already listening on {UPSTREAM_HOST}:{UPSTREAM_PORT}"
+        )
+    elif spawn_lock:
+        model_path = await asyncio.get_event_loop().run_in_executor(
+            None, prepare_model_and_get_path
+        )
+        await spawn_llama_server(model_path)
+        # Don't accept traffic until llama-server is listening
+        await _wait_for_upstream(UPSTREAM_READY_TIMEOUT)
+    else:
+        await _wait_for_upstream(UPSTREAM_READY_TIMEOUT, interval=1.0)
+
+    # Shared upstream client so proxied requests reuse keep-alive connections
+    app.state.http_client = httpx.AsyncClient(
+        base_url=f"http://{UPSTREAM_HOST}:{UPSTREAM_PORT}",
+        timeout=httpx.Timeout(120.0, connect=30.0),
+        limits=httpx.Limits(max_connections=1024, max_keepalive_connections=256),
     )
-    await spawn_llama_server(model_path)
+
+    if spawn_lock and WARMUP:
+        await _warmup_llama_server(app.state.http_client)
 
     yield
 
     # Shutdown
-    global llama_proc
-    if llama_proc and llama_proc.poll() is None:
+    await app.state.http_client.aclose()
+
+    if llama_proc and llama_proc.returncode is None:
+        await _terminate_llama_server(llama_proc)
+
+    if spawn_lock:
+        spawn_lock.close()
+        spawn_lock = None
+
+
+async def _terminate_llama_server(
+    proc: asyncio.subprocess.Process, timeout: float = 10.0
+) -> None:
+    """
+    Stop llama-server and everything in its process group.
+
+    Sends SIGTERM to the group, then SIGKILL if it has not exited in time.
+    The log pump tasks are then cancelled and awaited.
+
+    Args:
+        proc: llama-server process, started as a process group leader
+        timeout: Seconds to wait for a clean exit before killing
+    """
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
         try:
-            parent = psutil.Process(llama_proc.pid)
-            for child in parent.children(recursive=True):
-                child.terminate()
-            parent.terminate()
-            try:
-                parent.wait(timeout=10)
-            except psutil.TimeoutExpired:
-                parent.kill()
-        except Exception:
-            pass
+            await asyncio.wait_for(proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            os.killpg(proc.pid, signal.SIGKILL)
+            await proc.wait()
+    except Exception:
+        pass
+
+    tasks = list(_log_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
 
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# Compress large JSON completions for clients that accept gzip; SSE streams
+# (text/event-stream) are left untouched by the middleware
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
-app = FastAPI(lifespan=lifespan)
+
+def _slot_cache_args(extra_args: List[str]) -> List[str]:
+    """
+    Build llama-server arguments enabling prompt prefix reuse across requests.
+
+    Saved slots and KV cache reuse let requests sharing a prefix (such as a
+    common system prompt) skip recomputing it. Flags already present in the
+    user's LLAMA_CPP_ARGS are left to the user.
+
+    Args:
+        extra_args: Arguments supplied through LLAMA_CPP_ARGS
+
+    Returns:
+        Additional llama-server arguments, empty unless LLAMA_SLOTS=1
+    """
+    if not LLAMA_SLOTS:
+        return []
+
+    Path(LLAMA_SLOT_SAVE_PATH).mkdir(parents=True, exist_ok=True)
+    defaults = [
+        ("--slot-save-path", LLAMA_SLOT_SAVE_PATH),
+        # Each slot gets ctx-size / parallel tokens, so keep this modest
+        ("--parallel", str(LLAMA_PARALLEL)),
+        ("--cache-reuse", "256"),
+        ("--cont-batching", None),
+    ]
+    args: List[str] = []
+    for flag, value in defaults:
+        if flag in extra_args:
+            continue
+        args.append(flag)
+        if value is not None:
+            args.append(value)
+    return args
 
 
 async def spawn_llama_server(model_path: Optional[str]) -> None:
@@ -101,7 +368,7 @@ async def spawn_llama_server(model_path: Optional[str]) -> None:
         RuntimeError: If llama-server binary is not found or no model path provided
     """
     global llama_proc
-    if llama_proc and llama_proc.poll() is None:
+    if llama_proc and llama_proc.returncode is None:
         return
 
     llama_server_bin = shutil.which("llama-server")
@@ -125,36 +392,85 @@ async def spawn_llama_server(model_path: Optional[str]) -> None:
         raise RuntimeError("No model path provided")
     model_args = ["--model", model_path]
 
-    # Avoid duplicate flags from user
-    normalized = " ".join(extra_args)
-
     # Don't add duplicate host/port since they're already in base_args
     # The user's extra_args will override base_args if they specify host/port
 
-    cmd = base_args + model_args + extra_args
+    cmd = base_args + model_args + _slot_cache_args(extra_args) + extra_args
 
-    env = os.environ.copy()
-
-    llama_proc = subprocess.Popen(
-        cmd,
-        env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
+    # The child inherits this process's environment directly, and leads its
+    # own process group so shutdown can signal its whole tree at once
+    llama_proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        limit=LOG_LINE_LIMIT,
+        start_new_session=True,
     )
 
-    async def _log_output():
-        """Log output from the llama-server process."""
-        assert llama_proc and llama_proc.stdout
-        loop = asyncio.get_event_loop()
-        while True:
-            line = await loop.run_in_executor(None, llama_proc.stdout.readline)
-            if not line:
-                break
-            print(f"[llama-server] {line}", end="")
+    log_queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=LOG_QUEUE_SIZE)
+    for coro in (
+        _read_log_lines(llama_proc.stdout, log_queue),
+        _write_log_batches(log_queue),
+    ):
+        task = asyncio.create_task(coro)
+        _log_tasks.add(task)
+        task.add_done_callback(_log_tasks.discard)
+
+
+async def _read_log_lines(
+    stream: asyncio.StreamReader, queue: "asyncio.Queue[Optional[bytes]]"
+) -> None:
+    """
+    Move llama-server output lines from its pipe into the log queue.
+
+    Lines longer than the stream limit are skipped rather than ending the
+    reader, which would leave llama-server blocked on a full pipe.
+
+    Args:
+        stream: llama-server stdout (stderr is merged into it)
+        queue: Bounded queue consumed by _write_log_batches; None marks the end
+    """
+    while True:
+        try:
+            line = await stream.readline()
+        except ValueError:
+            # readline already discarded the overlong data from the buffer
+            continue
+        if not line:
+            break
+        try:
+            queue.put_nowait(line)
+        except asyncio.QueueFull:
+            pass
+    await queue.put(None)
+
+
+async def _write_log_batches(queue: "asyncio.Queue[Optional[bytes]]") -> None:
+    """
+    Write queued llama-server output lines to stdout in batches.
+
+    Every line already waiting in the queue (up to LOG_BATCH_LINES) goes out
+    in one write and flush, which keeps stdout lock and syscall traffic low
+    when llama-server is chatty.
 
-    asyncio.create_task(_log_output())
+    Args:
+        queue: Queue filled by _read_log_lines; None marks the end
+    """
+    done = False
+    while not done:
+        batch = [await queue.get()]
+        while len(batch) < LOG_BATCH_LINES and not queue.empty():
+            batch.append(queue.get_nowait())
+        if None in batch:
+            done = True
+            batch = batch[: batch.index(None)]
+        if batch:
+            sys.stdout.write(
+                "".join(
+                    f"[llama-server] {line.decode(errors='replace')}" for line in batch
+                )
+            )
+            sys.stdout.flush()
 
 
 @app.get("/ping")
@@ -168,72 +484,131 @@ async def ping():
     return PlainTextResponse("OK", status_code=200)
 
 
-async def _choose_openai_path(body: Dict[str, Any]) -> str:
+def _cache_key(
+    request: Request, path: str, body: Optional[Dict[str, Any]]
+) -> Optional[str]:
     """
-    Determine the appropriate OpenAI API endpoint based on request body.
+    Compute the response cache key for an idempotent request.
+
+    Only the model listing and non-streaming requests with a numeric
+    temperature of 0, whose output is deterministic, are cacheable. The query
+    string and Authorization header are part of the key, so a response is
+    only served again to a caller presenting the same credentials.
 
     Args:
-        body: Request body dictionary
+        request: FastAPI request object
+        path: Target path on the upstream server
+        body: Parsed JSON request body, if any
 
     Returns:
-        API endpoint path (/v1/chat/completions or /v1/completions)
+        SHA-256 hex digest identifying the request, or None if not cacheable
     """
-    if "messages" in body:
-        return "/v1/chat/completions"
-    return "/v1/completions"
+    if RESPONSE_CACHE_SIZE <= 0:
+        return None
+    method = request.method
+    if method == "GET" and path == "/v1/models":
+        payload = b""
+    elif (
+        method == "POST"
+        and isinstance(body, dict)
+        and not body.get("stream", False)
+        and type(body.get("temperature")) in (int, float)
+        and body["temperature"] == 0
+    ):
+        payload = orjson.dumps(body, option=orjson.OPT_SORT_KEYS)
+    else:
+        return None
+    authorization = request.headers.get("authorization", "")
+    prefix = f"{method} {path}?{request.url.query}\n{authorization}\n"
+    return hashlib.sha256(prefix.encode() + payload).hexdigest()
 
 
-async def _proxy_request(request: Request, path: str, stream: bool) -> Response:
+async def _proxy_request(
+    request: Request, path: str, stream: bool, cache_key: Optional[str] = None
+) -> Response:
     """
     Proxy a request to the upstream llama.cpp server.
 
+    Uses the shared client stored on ``app.state`` by the lifespan manager.
+    Non-streaming requests with a cache key are served from the response
+    cache when possible, and successful responses are added to it. All other
+    responses are relayed from upstream chunk by chunk.
+
     Args:
         request: FastAPI request object
         path: Target path on the upstream server
         stream: Whether this is a streaming request
+        cache_key: Response cache key from _cache_key(), or None to bypass
 
     Returns:
         Response: Proxied response from upstream server
     """
-    upstream = f"http://{UPSTREAM_HOST}:{UPSTREAM_PORT}{path}"
+    client: httpx.AsyncClient = request.app.state.http_client
     headers = dict(request.headers)
     headers.pop("host", None)
     headers.pop("connection", None)
 
-    timeout = httpx.Timeout(120.0, connect=30.0)
-
-    if stream:
-        req_stream = await request.body()
-
-        # For real streaming, we need to create a client that stays alive
-        async def stream_response():
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                async with client.stream(
-                    request.method, upstream, content=req_stream, headers=headers
-                ) as response:
-                    async for chunk in response.aiter_bytes():
-                        yield chunk
-
-        return StreamingResponse(
-            stream_response(), status_code=200, media_type="text/event-stream"
-        )
-    else:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            data = await request.body()
-            r = await client.request(
-                request.method, upstream, content=data, headers=headers
-            )
-            safe_headers = {}
-            ct = r.headers.get("content-type")
-            if ct:
-                safe_headers["content-type"] = ct
-            rid = r.headers.get("x-request-id")
-            if rid:
-                safe_headers["x-request-id"] = rid
+    if cache_key and not stream:
+        cached = _response_cache.get(cache_key)
+        if cached:
+            _response_cache.move_to_end(cache_key)
+            status_code, cached_headers, content = cached
             return Response(
-                content=r.content, status_code=r.status_code, headers=safe_headers
+                content=content,
+                status_code=status_code,
+                headers={**cached_headers, "x-cache": "HIT"},
             )
 
+        data = await request.body()
+        r = await client.request(request.method, path, content=data, headers=headers)
+        safe_headers = {}
+        ct = r.headers.get("content-type")
+        if ct:
+            safe_headers["content-type"] = ct
+        rid = r.headers.get("x-request-id")
+        if rid:
+            safe_headers["x-request-id"] = rid
+
+        if r.status_code == 200:
+            _response_cache[cache_key] = (r.status_code, safe_headers, r.content)
+            while len(_response_cache) > RESPONSE_CACHE_SIZE:
+                _response_cache.popitem(last=False)
+
+        return Response(
+            content=r.content,
+            status_code=r.status_code,
+            headers={**safe_headers, "x-cache": "MISS"},
+        )
+
+    # Everything else is relayed without buffering the response. Streaming
+    # request bodies are forwarded as they arrive, and the upstream response is
+    # opened first so its status and content type propagate
+    content = request.stream() if stream else await request.body()
+    upstream_request = client.build_request(
+        request.method, path, content=content, headers=headers
+    )
+    response = await client.send(upstream_request, stream=True)
+
+    # Raw chunks are still content-encoded, so the encoding and length are
+    # passed on with them
+    relay_headers = {}
+    for name in ("content-encoding", "content-length", "x-request-id"):
+        value = response.headers.get(name)
+        if value:
+            relay_headers[name] = value
+    default_type = "text/event-stream" if stream else None
+    # Raw chunks are relayed as soon as they arrive, without re-chunking, so
+    # SSE tokens are not held back. The upstream response is closed in a
+    # background task, which also runs when the client disconnects before the
+    # body is sent, so its connection always returns to the shared pool
+    return StreamingResponse(
+        response.aiter_raw(),
+        status_code=response.status_code,
+        headers=relay_headers,
+        media_type=response.headers.get("content-type", default_type),
+        background=BackgroundTask(response.aclose),
+    )
+
 
 @app.post("/invocations")
 async def invocations(request: Request):
@@ -253,13 +628,14 @@ async def invocations(request: Request):
         HTTPException: If request body is invalid JSON
     """
     try:
-        body = await request.json()
+        body = orjson.loads(await request.body())
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON body")
 
     stream = bool(body.get("stream", False))
-    path = await _choose_openai_path(body)
-    return await _proxy_request(request, path, stream)
+    path = "/v1/chat/completions" if "messages" in body else "/v1/completions"
+    cache_key = _cache_key(request, path, body)
+    return await _proxy_request(request, path, stream, cache_key)
 
 
 @app.api_route("/v1/{full_path:path}", methods=["GET", "POST", "PUT", "PATCH"])
@@ -268,7 +644,8 @@ async def openai_passthrough(full_path: str, request: Request):
     OpenAI-compatible API passthrough endpoint.
 
     Routes requests to the upstream llama.cpp server while providing basic validation
-    for common endpoints like chat/completions and completions.
+    for common endpoints like chat/completions and completions. Bodies for other
+    endpoints are forwarded without being decoded.
 
     Args:
         full_path: Full API path (e.g., "chat/completions", "models", etc.)
@@ -280,14 +657,22 @@ async def openai_passthrough(full_path: str, request: Request):
     Raises:
         HTTPException: If required fields are missing or JSON is invalid
     """
-    stream = False
+    stream = request.headers.get("accept", "").startswith("text/event-stream")
+    body = None
     if request.method in ("POST", "PUT", "PATCH"):
-        try:
-            body = await request.json()
-            stream = bool(body.get("stream", False))
+        # Starlette caches the body, so _proxy_request reuses this read
+        raw = await request.body()
+        if full_path in _VALIDATED_PATHS:
+            try:
+                body = orjson.loads(raw)
+                stream = stream or bool(body.get("stream", False))
+            except Exception:
+                if not stream:
+                    # Return 400 for invalid JSON in non-streaming requests
+                    raise HTTPException(status_code=400, detail="Invalid JSON body")
 
             # Basic validation for required fields
-            if full_path == "chat/completions":
+            if full_path == "chat/completions" and body is not None:
                 if "messages" not in body:
                     raise HTTPException(
                         status_code=400, detail="Missing required field: messages"
@@ -296,28 +681,31 @@ async def openai_passthrough(full_path: str, request: Request):
                     raise HTTPException(
                         status_code=400, detail="Invalid messages field"
                     )
-            elif full_path == "completions":
+            elif full_path == "completions" and body is not None:
                 if "prompt" not in body:
                     raise HTTPException(
                         status_code=400, detail="Missing required field: prompt"
                     )
+        else:
+            # Other endpoints are not validated, so avoid decoding the whole
+            # body just to look at the stream flag
+            stream = stream or b'"stream":true' in raw or b'"stream": true' in raw
 
-        except HTTPException:
-            raise
-        except Exception:
-            # Check if this is a streaming request by headers
-            if request.headers.get("accept", "").startswith("text/event-stream"):
-                stream = True
-            else:
-                # Return 400 for invalid JSON in non-streaming requests
-                raise HTTPException(status_code=400, detail="Invalid JSON body")
-    elif request.method == "GET":
-        stream = request.headers.get("accept", "").startswith("text/event-stream")
-
-    return await _proxy_request(request, f"/v1/{full_path}", stream)
+    path = f"/v1/{full_path}"
+    cache_key = _cache_key(request, path, body)
+    return await _proxy_request(request, path, stream, cache_key)
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=APP_PORT, log_level="info")
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=APP_PORT,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        log_level="info",
+        access_log=False,
+    )
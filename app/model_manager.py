@@ -23,15 +23,23 @@ import re
 import shlex
 import shutil
 import subprocess
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Tuple
 
 from app.sources_hf import download_hf
-from app.sources_s3 import download_s3
+from app.sources_s3 import _parse_s3_uri, _s3_client, download_s3
 
 MODELS_DIR = Path(os.getenv("MODELS_DIR", "/opt/models"))
 LLAMACPP_DIR = Path(os.getenv("LLAMACPP_DIR", "/opt/llama.cpp"))
 
+# Key suffixes that identify the model format of an S3 prefix
+GGUF_SUFFIXES = (".gguf",)
+HF_MODEL_SUFFIXES = (".safetensors", ".bin", "config.json")
+
+# Written into the download directory once every file has been fetched
+DOWNLOAD_COMPLETE_MARKER = ".download_complete"
+
 
 def _find_quantize_binary() -> Optional[str]:
     """
@@ -133,6 +141,41 @@ def _looks_like_hf_repo(dir_path: Path) -> bool:
     return (dir_path / "config.json").exists() or any(dir_path.glob("*.safetensors"))
 
 
+@lru_cache(maxsize=128)
+def _list_model_type_from_s3_uri(s3_uri: str) -> str:
+    """
+    List an S3 URI and classify the model files found there.
+
+    Results are cached per URI. Errors propagate and so are never cached.
+
+    Args:
+        s3_uri: S3 URI to analyze
+
+    Returns:
+        'gguf' if any listed key is a GGUF file, 'safetensors' if the keys
+        belong to a HuggingFace-format model, 'unknown' otherwise
+    """
+    s3 = _s3_client()
+    bucket, prefix = _parse_s3_uri(s3_uri)
+
+    # Check a few files to determine type; GGUF files win over HF files such
+    # as config.json that may sit next to them
+    saw_hf = False
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=bucket,
+        Prefix=prefix,
+        PaginationConfig={"MaxItems": 100, "PageSize": 100},
+    ):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            if key.endswith(GGUF_SUFFIXES):
+                return "gguf"
+            elif key.endswith(HF_MODEL_SUFFIXES):
+                saw_hf = True
+    return "safetensors" if saw_hf else "unknown"
+
+
 def _detect_model_type_from_s3_uri(s3_uri: str) -> str:
     """
     Detect if an S3 URI points to GGUF or safetensors files.
@@ -143,28 +186,55 @@ def _detect_model_type_from_s3_uri(s3_uri: str) -> str:
     Returns:
         'gguf' if URI points to GGUF files, 'safetensors' if safetensors, 'unknown' otherwise
     """
-    import boto3
-
-    from app.sources_s3 import _parse_s3_uri
-
     try:
-        s3 = boto3.client("s3")
-        bucket, prefix = _parse_s3_uri(s3_uri)
-
-        # Check a few files to determine type
-        paginator = s3.get_paginator("list_objects_v2")
-        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
-            for obj in page.get("Contents", []):
-                key = obj["Key"]
-                if key.endswith(".gguf"):
-                    return "gguf"
-                elif key.endswith(".safetensors"):
-                    return "safetensors"
-        return "unknown"
+        return _list_model_type_from_s3_uri(s3_uri)
     except Exception:
         return "unknown"
 
 
+def _download_model(tmp_root: Path, gguf_file: Optional[str]) -> None:
+    """
+    Download the configured model into a fresh staging directory.
+
+    Any partial download left in tmp_root by an interrupted run is removed first.
+
+    Args:
+        tmp_root: Staging directory for the download
+        gguf_file: Specific GGUF file to download, or None for the whole model
+
+    Raises:
+        RuntimeError: If no model source is provided, or MODEL_FILENAME is missing
+            for a GGUF model on S3
+    """
+    if tmp_root.exists():
+        shutil.rmtree(tmp_root, ignore_errors=True)
+    tmp_root.mkdir(parents=True, exist_ok=True)
+
+    # Download HuggingFace model
+    hf_model_id = os.environ.get("HF_MODEL_ID")
+    hf_model_uri = os.environ.get("HF_MODEL_URI")
+
+    if hf_model_id:
+        download_hf(repo_id=hf_model_id, dest_dir=tmp_root, filename=gguf_file)
+    elif hf_model_uri:
+        # For S3 downloads, determine if we need MODEL_FILENAME based on content type
+        model_type = _detect_model_type_from_s3_uri(hf_model_uri)
+
+        if model_type == "gguf" and not gguf_file:
+            error_msg = "MODEL_FILENAME is required for GGUF downloads from S3. Please specify the GGUF file to download."
+            print(f"ERROR: {error_msg}")
+            raise RuntimeError(error_msg)
+        elif model_type == "unknown" and not gguf_file:
+            # For backward compatibility, warn but allow if we can't detect
+            print(
+                "WARNING: Could not detect model type from S3 URI. Assuming safetensors format."
+            )
+
+        download_s3(s3_uri=hf_model_uri, dest_dir=tmp_root, filename=gguf_file)
+    else:
+        raise RuntimeError("Either HF_MODEL_ID or HF_MODEL_URI must be provided")
+
+
 def prepare_model_and_get_path() -> str:
     """
     Prepare the model for inference and return its path.
@@ -188,33 +258,13 @@ def prepare_model_and_get_path() -> str:
     model_root = MODELS_DIR / "current"
     if not model_root.exists():
         tmp_root = MODELS_DIR / "download"
-        if tmp_root.exists():
-            shutil.rmtree(tmp_root, ignore_errors=True)
-        tmp_root.mkdir(parents=True, exist_ok=True)
-
-        # Download HuggingFace model
-        hf_model_id = os.environ.get("HF_MODEL_ID")
-        hf_model_uri = os.environ.get("HF_MODEL_URI")
-
-        if hf_model_id:
-            download_hf(repo_id=hf_model_id, dest_dir=tmp_root, filename=gguf_file)
-        elif hf_model_uri:
-            # For S3 downloads, determine if we need MODEL_FILENAME based on content type
-            model_type = _detect_model_type_from_s3_uri(hf_model_uri)
-
-            if model_type == "gguf" and not gguf_file:
-                error_msg = "MODEL_FILENAME is required for GGUF downloads from S3. Please specify the GGUF file to download."
-                print(f"ERROR: {error_msg}")
-                raise RuntimeError(error_msg)
-            elif model_type == "unknown" and not gguf_file:
-                # For backward compatibility, warn but allow if we can't detect
-                print(
-                    "WARNING: Could not detect model type from S3 URI. Assuming safetensors format."
-                )
-
-            download_s3(s3_uri=hf_model_uri, dest_dir=tmp_root, filename=gguf_file)
+        marker = tmp_root / DOWNLOAD_COMPLETE_MARKER
+        if marker.is_file():
+            # A previous run finished downloading but stopped before the rename
+            print(f"Reusing completed download in {tmp_root}")
         else:
-            raise RuntimeError("Either HF_MODEL_ID or HF_MODEL_URI must be provided")
+            _download_model(tmp_root, gguf_file)
+            marker.touch()
 
         tmp_root.rename(model_root)
 
@@ -10,20 +10,55 @@ progress information.
 Environment Variables:
     HF_TOKEN: Hugging Face authentication token
     HUGGINGFACE_TOKEN: Alternative Hugging Face token environment variable
+    HF_HUB_ENABLE_HF_TRANSFER: Use the hf_transfer multi-connection downloader
+        (default: 1)
+    HF_DOWNLOAD_WORKERS: Number of files downloaded concurrently for full
+        repositories (default: 8)
+    HF_ALLOW_PATTERNS: Comma-separated glob patterns limiting which files of a
+        full repository are downloaded (default: all files)
 """
 
 import os
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
+
+
+def _enable_hf_transfer_default() -> None:
+    """
+    Turn on the hf_transfer downloader unless HF_HUB_ENABLE_HF_TRANSFER is set.
+    """
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
+
+# huggingface_hub reads this once at import time, so it must be set first
+_enable_hf_transfer_default()
 
 from huggingface_hub import snapshot_download
 
 
+@lru_cache(maxsize=8)
+def _resolve_hf_token(explicit: Optional[str]) -> Optional[str]:
+    """
+    Resolve the Hugging Face token to use for a download.
+
+    Results are cached per explicit token for the life of the process.
+
+    Args:
+        explicit: Token passed by the caller, if any
+
+    Returns:
+        The explicit token, else HF_TOKEN, else HUGGINGFACE_TOKEN, else None
+    """
+    return explicit or os.getenv("HF_TOKEN") or os.getenv("HUGGINGFACE_TOKEN")
+
+
 def download_hf(
     repo_id: str,
     dest_dir: Path,
     token: Optional[str] = None,
     filename: Optional[str] = None,
+    allow_patterns: Optional[List[str]] = None,
 ) -> None:
     """
     Download a model from Hugging Face Hub
@@ -33,6 +68,8 @@ def download_hf(
         dest_dir: Destination directory for the downloaded model
         token: Hugging Face token for gated/private models
         filename: Specific file to download (e.g., "model.gguf")
+        allow_patterns: Glob patterns of repository files to download
+            (e.g., ["*.gguf"]); defaults to HF_ALLOW_PATTERNS, or all files
 
     Raises:
         RuntimeError: If download fails
@@ -42,9 +79,11 @@ def download_hf(
         print(f"Downloading specific file: {filename}")
     print(f"Destination: {dest_dir}")
 
-    # Get token from environment if not provided
-    if not token:
-        token = os.getenv("HF_TOKEN") or os.getenv("HUGGINGFACE_TOKEN")
+    token = _resolve_hf_token(token)
+
+    if allow_patterns is None:
+        patterns = os.getenv("HF_ALLOW_PATTERNS", "").split(",")
+        allow_patterns = [p.strip() for p in patterns if p.strip()] or None
 
     try:
         if filename:
@@ -66,6 +105,8 @@ def download_hf(
                 repo_id=repo_id,
                 local_dir=str(dest_dir),
                 token=token,
+                max_workers=int(os.getenv("HF_DOWNLOAD_WORKERS", "8")),
+                allow_patterns=allow_patterns,
             )
             print(f"✅ Successfully downloaded {repo_id} to {dest_dir}")
 
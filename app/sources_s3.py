@@ -3,19 +3,77 @@ S3 model download utilities.
 
 This module provides functions for downloading models from Amazon S3,
 supporting both single file downloads and directory structures.
-It handles S3 URI parsing, pagination for large directories, and
-provides detailed progress information.
+It handles S3 URI parsing, pagination for large directories, concurrent
+multi-file downloads, and provides detailed progress information.
 
 The module supports downloading from S3 URIs in the format:
 s3://bucket-name/path/to/model/files/
+
+Environment Variables:
+    S3_DOWNLOAD_WORKERS: Maximum number of files downloaded concurrently (default: 32)
+    S3_MULTIPART_CONCURRENCY: Parallel ranged GETs per object (default: 10)
 """
 
 import os
-import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
-from typing import Tuple
+from typing import Iterator, Optional, Tuple
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+# Default upper bound on files downloaded concurrently from a multi-file prefix
+MAX_DOWNLOAD_WORKERS = 32
+
+# Completed files between progress lines when downloading a prefix
+PROGRESS_INTERVAL = 100
+
+# Keys per ListObjectsV2 request (the S3 maximum)
+LIST_PAGE_SIZE = 1000
+
+# Multipart settings applied to every object download
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=int(os.getenv("S3_MULTIPART_CONCURRENCY", "10")),
+    use_threads=True,
+)
+
+
+def _download_workers() -> int:
+    """
+    Get the number of files downloaded concurrently from a multi-file prefix.
+
+    Returns:
+        S3_DOWNLOAD_WORKERS, or MAX_DOWNLOAD_WORKERS when unset
+    """
+    return int(os.getenv("S3_DOWNLOAD_WORKERS", str(MAX_DOWNLOAD_WORKERS)))
+
+
+@lru_cache(maxsize=1)
+def _s3_client():
+    """
+    Return a process-wide S3 client.
+
+    The client is created on first use and reused afterwards, which avoids
+    repeated credential and endpoint resolution and shares its connection pool.
+    The pool holds a connection for every ranged GET the download pool can run
+    at once (files in flight times parts per file). Throttling and transient
+    errors are retried inside the client with adaptive backoff, so one slow
+    request does not fail the whole download.
+
+    Returns:
+        boto3 S3 client
+    """
+    config = Config(
+        max_pool_connections=_download_workers() * _TRANSFER_CONFIG.max_concurrency,
+        retries={"max_attempts": 10, "mode": "adaptive"},
+        tcp_keepalive=True,
+    )
+    return boto3.client("s3", config=config)
 
 
 def _parse_s3_uri(s3_uri: str) -> Tuple[str, str]:
@@ -29,22 +87,53 @@ def _parse_s3_uri(s3_uri: str) -> Tuple[str, str]:
         Tuple of (bucket_name, prefix)
 
     Raises:
+        TypeError: If the S3 URI is not a string
         ValueError: If the S3 URI format is invalid
     """
-    m = re.match(r"^s3://([^/]+)/?(.*)$", s3_uri)
-    if not m:
+    if not isinstance(s3_uri, str):
+        raise TypeError(
+            f"expected string or bytes-like object, got {type(s3_uri).__name__!r}"
+        )
+    if not s3_uri.startswith("s3://"):
+        raise ValueError(f"Invalid S3 URI: {s3_uri}")
+    bucket, _, prefix = s3_uri[5:].partition("/")
+    if not bucket:
         raise ValueError(f"Invalid S3 URI: {s3_uri}")
-    bucket, prefix = m.group(1), m.group(2)
     return bucket, prefix
 
 
-def download_s3(s3_uri: str, dest_dir: Path, filename: str = None) -> None:
+def _iter_keys(s3, bucket: str, prefix: str) -> Iterator[str]:
+    """
+    Yield the object keys under a prefix as listing pages arrive.
+
+    Args:
+        s3: S3 client
+        bucket: Bucket to list
+        prefix: Key prefix to list
+
+    Yields:
+        Object keys, skipping directory placeholder keys ending in "/"
+    """
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=bucket, Prefix=prefix, PaginationConfig={"PageSize": LIST_PAGE_SIZE}
+    ):
+        # Slicing skips a method call per key, which adds up on large prefixes
+        yield from (
+            key
+            for key in (obj["Key"] for obj in page.get("Contents", ()))
+            if key[-1:] != "/"
+        )
+
+
+def download_s3(s3_uri: str, dest_dir: Path, filename: Optional[str] = None) -> None:
     """
     Download files from an S3 URI to a local directory.
 
     This function handles both single file downloads and directory structures.
     For single files, it downloads directly to the destination directory.
-    For directories, it preserves the directory structure.
+    For directories, it preserves the directory structure and downloads
+    files concurrently.
     When filename is provided, only that specific file is downloaded.
 
     Args:
@@ -57,7 +146,7 @@ def download_s3(s3_uri: str, dest_dir: Path, filename: str = None) -> None:
         Exception: If download fails due to S3 permissions or network issues
     """
     dest_dir.mkdir(parents=True, exist_ok=True)
-    s3 = boto3.client("s3")
+    s3 = _s3_client()
     bucket, prefix = _parse_s3_uri(s3_uri)
 
     print(f"Downloading model from S3: {s3_uri}")
@@ -69,44 +158,63 @@ def download_s3(s3_uri: str, dest_dir: Path, filename: str = None) -> None:
         target = dest_dir / filename
         print(f"Downloading specific file: {file_key} to {target}")
         try:
-            s3.download_file(bucket, file_key, str(target))
+            s3.download_file(bucket, file_key, str(target), Config=_TRANSFER_CONFIG)
             print(f"Successfully downloaded: {target}")
             return
         except Exception as e:
             raise ValueError(f"Failed to download {file_key}: {str(e)}")
 
-    # Check if this is a single file or directory
-    paginator = s3.get_paginator("list_objects_v2")
-    objects = []
-    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
-        for obj in page.get("Contents", []):
-            key = obj["Key"]
-            if key.endswith("/"):
-                continue
-            objects.append(key)
-
-    if not objects:
+    # List lazily so downloads can start while later pages are still listed
+    keys = _iter_keys(s3, bucket, prefix)
+    first = next(keys, None)
+    if first is None:
         raise ValueError(f"No files found in S3 URI: {s3_uri}")
-
-    print(f"Found {len(objects)} object(s) to download")
+    second = next(keys, None)
 
     # If it's a single file, download directly to dest_dir
-    if len(objects) == 1 and objects[0] == prefix:
-        # Single file download
+    if second is None and first == prefix:
+        print("Found 1 object(s) to download")
         filename = os.path.basename(prefix) if prefix else "model.gguf"
         target = dest_dir / filename
         print(f"Downloading single file to: {target}")
-        s3.download_file(bucket, prefix, str(target))
+        s3.download_file(bucket, prefix, str(target), Config=_TRANSFER_CONFIG)
         print(f"Successfully downloaded: {target}")
     else:
         # Multiple files or directory structure
-        print(f"Downloading {len(objects)} files to directory structure")
-        for key in objects:
-            if key.endswith("/"):
-                continue
-            rel = key[len(prefix) :].lstrip("/") if prefix else key
-            target = dest_dir / rel
-            target.parent.mkdir(parents=True, exist_ok=True)
-            print(f"Downloading {key} to {target}")
-            s3.download_file(bucket, key, str(target))
+        max_workers = _download_workers()
+        pending = [first] if second is None else [first, second]
+        # Build targets as strings and create each parent directory once
+        base = os.path.join(os.fspath(dest_dir), "")
+        created_dirs = {base}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            for key in chain(pending, keys):
+                rel = key[len(prefix) :].lstrip("/") if prefix else key
+                target = base + rel
+                parent = os.path.dirname(target) + os.sep
+                if parent not in created_dirs:
+                    os.makedirs(parent, exist_ok=True)
+                    created_dirs.add(parent)
+                futures.append(
+                    executor.submit(
+                        s3.download_file,
+                        bucket,
+                        key,
+                        target,
+                        Config=_TRANSFER_CONFIG,
+                    )
+                )
+            print(f"Found {len(futures)} object(s) to download")
+            print(f"Downloading {len(futures)} files to directory structure")
+            total = len(futures)
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    future.result()
+                    if done % PROGRESS_INTERVAL == 0 or done == total:
+                        print(f"Downloaded {done}/{total} files")
+            except BaseException:
+                # Drop queued transfers so a failure surfaces without waiting
+                # for the rest of the model to download
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
         print("Successfully downloaded all files")
@@ -5,18 +5,22 @@ This module provides shared fixtures, test configuration, and utilities
 for all test modules in the project.
 """
 
+import json
 import os
-import shutil
-import tempfile
 from pathlib import Path
-from typing import Any, Dict, Generator
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, Dict, Generator
 from unittest.mock import Mock, patch
 
 import httpx
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.model_manager import _list_model_type_from_s3_uri
+from app.sources_hf import _resolve_hf_token
+from app.sources_s3 import _s3_client
 
 
 @pytest.fixture(scope="session")
@@ -25,30 +29,82 @@ def test_data_dir() -> Path:
     return Path(__file__).parent / "data"
 
 
-@pytest.fixture(scope="function")
-def temp_dir() -> Generator[Path, None, None]:
-    """Provide a temporary directory for each test."""
-    temp_dir = Path(tempfile.mkdtemp())
-    yield temp_dir
-    shutil.rmtree(temp_dir, ignore_errors=True)
+@pytest.fixture(autouse=True)
+def clear_s3_client_cache() -> Generator[None, None, None]:
+    """Drop cached S3 clients and listings so each test sees its own boto3 patch."""
+    _s3_client.cache_clear()
+    _list_model_type_from_s3_uri.cache_clear()
+    yield
+    _s3_client.cache_clear()
+    _list_model_type_from_s3_uri.cache_clear()
 
 
-@pytest.fixture(scope="function")
-def mock_env() -> Generator[Dict[str, str], None, None]:
-    """Provide a clean environment for each test."""
-    original_env = os.environ.copy()
-    os.environ.clear()
-    yield {}
-    os.environ.clear()
-    os.environ.update(original_env)
+@pytest.fixture(autouse=True)
+def clear_hf_token_cache() -> Generator[None, None, None]:
+    """Drop the cached Hugging Face token so env patches take effect."""
+    _resolve_hf_token.cache_clear()
+    yield
+    _resolve_hf_token.cache_clear()
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="session")
+def shared_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Provide a directory created once for read-only session fixtures."""
+    return tmp_path_factory.mktemp("shared", numbered=False)
+
+
+@pytest.fixture(scope="session")
+def download_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Provide one destination directory for download tests with mocked transfers.
+
+    Tests that create or inspect real directories should use tmp_path instead.
+    """
+    return tmp_path_factory.mktemp("download", numbered=False)
+
+
+@pytest.fixture(scope="session")
 def fastapi_client() -> TestClient:
-    """Provide a FastAPI test client."""
+    """Provide a FastAPI test client shared by the whole session.
+
+    The client is never entered, so the lifespan does not run and no model is
+    prepared or llama-server spawned.
+    """
     return TestClient(app)
 
 
+@pytest.fixture(scope="function")
+def fastapi_client_with_lifespan() -> Generator[TestClient, None, None]:
+    """Provide a FastAPI test client with the lifespan started.
+
+    Model preparation, llama-server spawning and the upstream readiness wait
+    are patched out, so startup only creates the shared upstream HTTP client.
+    The spawn lock is patched too, so the real lock file is never taken.
+    """
+    with patch(
+        "app.main.prepare_model_and_get_path", return_value="/tmp/model.gguf"
+    ), patch("app.main.spawn_llama_server"), patch(
+        "app.main._wait_for_upstream"
+    ), patch(
+        "app.main._try_acquire_spawn_lock"
+    ), patch(
+        "app.main._upstream_accepts_connections", return_value=False
+    ):
+        with TestClient(app) as client:
+            yield client
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def async_client() -> AsyncGenerator[httpx.AsyncClient, None]:
+    """Provide an httpx client that calls the app in-process over ASGI.
+
+    The client is closed on the session event loop shared by async tests.
+    """
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
 @pytest.fixture(scope="function")
 def mock_httpx_client() -> Generator[Mock, None, None]:
     """Provide a mocked httpx client for testing HTTP requests."""
@@ -68,55 +124,92 @@ def mock_subprocess() -> Generator[Mock, None, None]:
         yield mock_popen
 
 
-@pytest.fixture(scope="function")
-def mock_psutil() -> Generator[Mock, None, None]:
-    """Provide a mocked psutil for testing process management."""
-    with patch("psutil.Process") as mock_process_class:
-        mock_process = Mock()
-        mock_process.children.return_value = []
-        mock_process.terminate.return_value = None
-        mock_process.wait.return_value = None
-        mock_process_class.return_value = mock_process
-        yield mock_process_class
+@pytest.fixture(scope="session", autouse=True)
+def network_guard() -> Generator[SimpleNamespace, None, None]:
+    """Patch the S3 and Hugging Face download entry points for the whole session.
+
+    No unit test needs live S3 or Hub access, so one set of patches keeps
+    them all offline; tests that patch these targets themselves still take
+    precedence. httpx.AsyncClient is left alone because the ASGI test client
+    and the lifespan tests need the real class.
+    """
+    with patch("boto3.client") as boto3_client, patch(
+        "huggingface_hub.snapshot_download"
+    ) as snapshot_download, patch(
+        "app.sources_hf.snapshot_download", snapshot_download
+    ), patch(
+        "huggingface_hub.hf_hub_download"
+    ) as hf_hub_download:
+        yield SimpleNamespace(
+            boto3_client=boto3_client,
+            snapshot_download=snapshot_download,
+            hf_hub_download=hf_hub_download,
+        )
 
 
 @pytest.fixture(scope="function")
-def mock_boto3() -> Generator[Mock, None, None]:
-    """Provide a mocked boto3 client for testing S3 operations."""
-    with patch("boto3.client") as mock_client:
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {"Contents": [{"Key": "test/model.gguf"}]}
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_s3.download_file.return_value = None
-        mock_client.return_value = mock_s3
-        yield mock_client
+def mock_boto3(network_guard: SimpleNamespace) -> Mock:
+    """Provide the session boto3 client mock, configured for S3 operations."""
+    mock_client = network_guard.boto3_client
+    mock_client.reset_mock(return_value=True, side_effect=True)
+    mock_s3 = Mock()
+    mock_paginator = Mock()
+    mock_page = {"Contents": [{"Key": "test/model.gguf"}]}
+    mock_paginator.paginate.return_value = [mock_page]
+    mock_s3.get_paginator.return_value = mock_paginator
+    mock_s3.download_file.return_value = None
+    mock_client.return_value = mock_s3
+    return mock_client
 
 
 @pytest.fixture(scope="function")
-def mock_huggingface_hub() -> Generator[Mock, None, None]:
-    """Provide a mocked huggingface_hub for testing HF downloads."""
-    with patch("huggingface_hub.snapshot_download") as mock_snapshot, patch(
-        "huggingface_hub.hf_hub_download"
-    ) as mock_download:
-        mock_snapshot.return_value = None
-        mock_download.return_value = "/tmp/test/model.gguf"
-        yield {"snapshot": mock_snapshot, "download": mock_download}
+def s3_mock(network_guard: SimpleNamespace) -> SimpleNamespace:
+    """Provide a fresh S3 client behind the session boto3 patch.
+
+    Call set_keys with a list of object keys to have the paginator return
+    them as a single listing page.
+    """
+    boto3_client = network_guard.boto3_client
+    boto3_client.reset_mock(return_value=True, side_effect=True)
+    client = Mock()
+    paginator = client.get_paginator.return_value
+    boto3_client.return_value = client
+
+    def set_keys(keys: list) -> None:
+        paginator.paginate.return_value = [{"Contents": [{"Key": k} for k in keys]}]
+
+    return SimpleNamespace(
+        boto3_client=boto3_client,
+        client=client,
+        paginator=paginator,
+        set_keys=set_keys,
+    )
 
 
 @pytest.fixture(scope="function")
-def sample_gguf_model(temp_dir: Path) -> Path:
+def mock_huggingface_hub(network_guard: SimpleNamespace) -> Dict[str, Mock]:
+    """Provide the session huggingface_hub mocks, configured for HF downloads."""
+    mock_snapshot = network_guard.snapshot_download
+    mock_download = network_guard.hf_hub_download
+    for mock in (mock_snapshot, mock_download):
+        mock.reset_mock(return_value=True, side_effect=True)
+    mock_snapshot.return_value = None
+    mock_download.return_value = "/tmp/test/model.gguf"
+    return {"snapshot": mock_snapshot, "download": mock_download}
+
+
+@pytest.fixture(scope="session")
+def sample_gguf_model(shared_dir: Path) -> Path:
     """Provide a sample GGUF model file for testing."""
-    model_path = temp_dir / "test_model.gguf"
+    model_path = shared_dir / "test_model.gguf"
     model_path.write_bytes(b"fake gguf model content")
     return model_path
 
 
-@pytest.fixture(scope="function")
-def sample_hf_model(temp_dir: Path) -> Path:
+@pytest.fixture(scope="session")
+def sample_hf_model(shared_dir: Path) -> Path:
     """Provide a sample HuggingFace model directory for testing."""
-    model_dir = temp_dir / "hf_model"
+    model_dir = shared_dir / "hf_model"
     model_dir.mkdir()
 
     # Create config.json
@@ -128,7 +221,7 @@ def sample_hf_model(temp_dir: Path) -> Path:
         "num_attention_heads": 32,
         "num_hidden_layers": 32,
     }
-    (model_dir / "config.json").write_text(str(config))
+    (model_dir / "config.json").write_text(json.dumps(config))
 
     # Create a sample safetensors file
     (model_dir / "model-00001-of-00002.safetensors").write_bytes(
@@ -138,45 +231,45 @@ def sample_hf_model(temp_dir: Path) -> Path:
     return model_dir
 
 
-@pytest.fixture(scope="function")
-def mock_llama_server_binary(temp_dir: Path) -> Path:
+@pytest.fixture(scope="session")
+def mock_llama_server_binary(shared_dir: Path) -> Path:
     """Provide a mock llama-server binary for testing."""
-    binary_path = temp_dir / "llama-server"
+    binary_path = shared_dir / "llama-server"
     binary_path.write_text("#!/bin/bash\necho 'mock llama-server'")
     binary_path.chmod(0o755)
     return binary_path
 
 
-@pytest.fixture(scope="function")
-def mock_quantize_binary(temp_dir: Path) -> Path:
+@pytest.fixture(scope="session")
+def mock_quantize_binary(shared_dir: Path) -> Path:
     """Provide a mock llama-quantize binary for testing."""
-    binary_path = temp_dir / "llama-quantize"
+    binary_path = shared_dir / "llama-quantize"
     binary_path.write_text("#!/bin/bash\necho 'mock llama-quantize'")
     binary_path.chmod(0o755)
     return binary_path
 
 
-@pytest.fixture(scope="function")
-def mock_convert_script(temp_dir: Path) -> Path:
+@pytest.fixture(scope="session")
+def mock_convert_script(shared_dir: Path) -> Path:
     """Provide a mock convert_hf_to_gguf.py script for testing."""
-    script_path = temp_dir / "convert_hf_to_gguf.py"
+    script_path = shared_dir / "convert_hf_to_gguf.py"
     script_path.write_text("#!/usr/bin/env python3\nprint('mock conversion script')")
     script_path.chmod(0o755)
     return script_path
 
 
 @pytest.fixture(scope="function")
-def mock_models_dir(temp_dir) -> Generator[Path, None, None]:
+def mock_models_dir(tmp_path) -> Generator[Path, None, None]:
     """Provide a mocked MODELS_DIR to prevent permission errors."""
-    with patch("app.model_manager.MODELS_DIR", temp_dir / "models"):
-        yield temp_dir / "models"
+    with patch("app.model_manager.MODELS_DIR", tmp_path / "models"):
+        yield tmp_path / "models"
 
 
 @pytest.fixture(scope="function")
-def mock_llamacpp_dir(temp_dir) -> Generator[Path, None, None]:
+def mock_llamacpp_dir(tmp_path) -> Generator[Path, None, None]:
     """Provide a mocked LLAMACPP_DIR to prevent permission errors."""
-    with patch("app.model_manager.LLAMACPP_DIR", temp_dir / "llamacpp"):
-        yield temp_dir / "llamacpp"
+    with patch("app.model_manager.LLAMACPP_DIR", tmp_path / "llamacpp"):
+        yield tmp_path / "llamacpp"
 
 
 # Test configuration
@@ -194,11 +287,24 @@ def pytest_configure(config):
 
 def pytest_collection_modifyitems(config, items):
     """Modify test collection to add default markers."""
+    run_real_model = os.getenv("RUN_REAL_MODEL_TESTS") == "1"
+    skip_real_model = pytest.mark.skip(
+        reason="Set RUN_REAL_MODEL_TESTS=1 to run real-model container test"
+    )
     for item in items:
         # Add unit marker to tests that don't have integration marker
         if "integration" not in item.keywords:
             item.add_marker(pytest.mark.unit)
 
-        # Add mock marker to tests that use mocks
-        if any("mock" in str(arg) for arg in item.funcargs.values()):
+        # Slow container tests download real models and are opt-in
+        if (
+            not run_real_model
+            and "container" in item.keywords
+            and "slow" in item.keywords
+        ):
+            item.add_marker(skip_real_model)
+
+        # Add mock marker to tests that request mock fixtures; fixture names
+        # are known at collection time, unlike their values in funcargs
+        if any(name.startswith("mock_") for name in item.fixturenames):
             item.add_marker(pytest.mark.mock)
@@ -7,64 +7,201 @@ including request handling, path selection, and proxy functionality.
 
 import asyncio
 import json
-import os
-import subprocess
+import signal
+import socket
 from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, Mock, patch
 
+import httpx
 import pytest
-from fastapi import HTTPException
-from fastapi.testclient import TestClient
+from fastapi import HTTPException, Response
 
 from app.main import (
-    _choose_openai_path,
+    _cache_key,
+    _load_config,
+    _log_tasks,
     _proxy_request,
+    _read_log_lines,
+    _response_cache,
+    _slot_cache_args,
+    _terminate_llama_server,
+    _try_acquire_spawn_lock,
+    _wait_for_upstream,
+    _warmup_llama_server,
+    _write_log_batches,
     app,
     invocations,
     lifespan,
     openai_passthrough,
-    ping,
     spawn_llama_server,
 )
 
 
-class TestChooseOpenAIPath:
-    """Test the _choose_openai_path function"""
+class TestInvocationsRouting:
+    """Test how invocations picks the upstream OpenAI endpoint"""
+
+    @staticmethod
+    async def _route(body):
+        """Return the upstream path invocations selects for a body."""
+        mock_request = AsyncMock()
+        mock_request.method = "POST"
+        mock_request.body = AsyncMock(return_value=json.dumps(body).encode())
+        with patch("app.main._proxy_request") as mock_proxy:
+            await invocations(mock_request)
+        return mock_proxy.call_args[0][1]
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "body,expected",
+        [
+            (
+                {"messages": [{"role": "user", "content": "Hello"}]},
+                "/v1/chat/completions",
+            ),
+            ({"prompt": "Hello", "max_tokens": 100}, "/v1/completions"),
+            ({}, "/v1/completions"),
+            ({"temperature": 0.7, "top_p": 0.9}, "/v1/completions"),
+        ],
+        ids=["with_messages", "without_messages", "empty_body", "other_fields"],
+    )
+    async def test_choose_path(self, body, expected):
+        """Test that only bodies with messages go to chat completions."""
+        assert await self._route(body) == expected
+
+
+# TestSpawnLlamaServer class removed - functionality tested in live container tests
+
+
+class TestLlamaServerLogging:
+    """Test the llama-server log pump"""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_log_lines_are_written_with_prefix(self, capsys):
+        """Test that output lines are relayed to stdout in order."""
+        stream = asyncio.StreamReader()
+        stream.feed_data(b"loading model\nserver listening\n")
+        stream.feed_eof()
+        queue = asyncio.Queue(maxsize=16)
+
+        await _read_log_lines(stream, queue)
+        await _write_log_batches(queue)
+
+        assert capsys.readouterr().out == (
+            "[llama-server] loading model\n[llama-server] server listening\n"
+        )
 
     @pytest.mark.unit
     @pytest.mark.asyncio
-    async def test_choose_path_with_messages(self):
-        """Test path selection when messages field is present."""
-        body = {"messages": [{"role": "user", "content": "Hello"}]}
-        result = await _choose_openai_path(body)
-        assert result == "/v1/chat/completions"
+    async def test_log_lines_batched_into_single_write(self):
+        """Test that queued lines are written together."""
+        queue = asyncio.Queue()
+        for i in range(3):
+            queue.put_nowait(f"line {i}\n".encode())
+        queue.put_nowait(None)
+
+        with patch("app.main.sys.stdout") as mock_stdout:
+            await _write_log_batches(queue)
+
+        mock_stdout.write.assert_called_once_with(
+            "[llama-server] line 0\n[llama-server] line 1\n[llama-server] line 2\n"
+        )
 
     @pytest.mark.unit
     @pytest.mark.asyncio
-    async def test_choose_path_without_messages(self):
-        """Test path selection when messages field is not present."""
-        body = {"prompt": "Hello", "max_tokens": 100}
-        result = await _choose_openai_path(body)
-        assert result == "/v1/completions"
+    async def test_log_lines_dropped_when_queue_full(self):
+        """Test that a full queue drops lines instead of blocking the reader."""
+        stream = asyncio.StreamReader()
+        stream.feed_data(b"a\nb\nc\n")
+        stream.feed_eof()
+        queue = asyncio.Queue(maxsize=2)
+
+        reader = asyncio.create_task(_read_log_lines(stream, queue))
+        await asyncio.sleep(0)
+        assert [queue.get_nowait(), queue.get_nowait()] == [b"a\n", b"b\n"]
+        await reader
+        assert queue.get_nowait() is None
 
     @pytest.mark.unit
     @pytest.mark.asyncio
-    async def test_choose_path_empty_body(self):
-        """Test path selection with empty body."""
-        body = {}
-        result = await _choose_openai_path(body)
-        assert result == "/v1/completions"
+    async def test_log_reader_survives_overlong_line(self):
+        """Test that a line over the stream limit is skipped, not fatal."""
+        stream = asyncio.StreamReader(limit=8)
+        stream.feed_data(b"ok\n" + b"x" * 32 + b"\nafter\n")
+        stream.feed_eof()
+        queue = asyncio.Queue()
+
+        await _read_log_lines(stream, queue)
+
+        lines = []
+        while not queue.empty():
+            lines.append(queue.get_nowait())
+        assert lines[0] == b"ok\n"
+        assert lines[-2:] == [b"after\n", None]
 
     @pytest.mark.unit
     @pytest.mark.asyncio
-    async def test_choose_path_with_other_fields(self):
-        """Test path selection with other fields but no messages."""
-        body = {"temperature": 0.7, "top_p": 0.9}
-        result = await _choose_openai_path(body)
-        assert result == "/v1/completions"
+    async def test_spawn_keeps_log_tasks(self):
+        """Test that the log pump tasks are referenced until they finish."""
+        stdout = asyncio.StreamReader()
+        stdout.feed_eof()
+        proc = Mock(stdout=stdout, returncode=None)
+
+        with patch("app.main.llama_proc", None), patch(
+            "app.main.shutil.which", return_value="/usr/bin/llama-server"
+        ), patch(
+            "app.main.asyncio.create_subprocess_exec",
+            new=AsyncMock(return_value=proc),
+        ):
+            await spawn_llama_server("/tmp/model.gguf")
+            tasks = set(_log_tasks)
 
+        assert len(tasks) == 2
+        await asyncio.gather(*tasks)
+        assert not _log_tasks
 
-# TestSpawnLlamaServer class removed - functionality tested in live container tests
+
+class TestSlotCacheArgs:
+    """Test the llama-server slot cache arguments"""
+
+    @pytest.mark.unit
+    def test_slot_cache_args_disabled_by_default(self):
+        """Test that no extra arguments are added unless LLAMA_SLOTS=1."""
+        with patch("app.main.LLAMA_SLOTS", False):
+            assert _slot_cache_args([]) == []
+
+    @pytest.mark.unit
+    def test_slot_cache_args_enabled(self, tmp_path):
+        """Test the arguments added when slot caching is enabled."""
+        slot_dir = tmp_path / "slots"
+        with patch("app.main.LLAMA_SLOTS", True), patch(
+            "app.main.LLAMA_SLOT_SAVE_PATH", str(slot_dir)
+        ), patch("app.main.LLAMA_PARALLEL", 2):
+            args = _slot_cache_args([])
+
+        assert args == [
+            "--slot-save-path",
+            str(slot_dir),
+            "--parallel",
+            "2",
+            "--cache-reuse",
+            "256",
+            "--cont-batching",
+        ]
+        assert slot_dir.is_dir()
+
+    @pytest.mark.unit
+    def test_slot_cache_args_respect_user_flags(self, tmp_path):
+        """Test that flags from LLAMA_CPP_ARGS are not duplicated."""
+        with patch("app.main.LLAMA_SLOTS", True), patch(
+            "app.main.LLAMA_SLOT_SAVE_PATH", str(tmp_path / "slots")
+        ):
+            args = _slot_cache_args(["--parallel", "8"])
+
+        assert "--parallel" not in args
+        assert "--slot-save-path" in args
 
 
 class TestProxyRequest:
@@ -72,44 +209,67 @@ class TestProxyRequest:
 
     @pytest.mark.unit
     @pytest.mark.asyncio
-    @patch("httpx.AsyncClient")
-    async def test_proxy_request_non_streaming(self, mock_client_class):
+    async def test_proxy_request_non_streaming(self):
         """Test non-streaming proxy request."""
+
+        async def upstream_chunks():
+            yield b'{"result": '
+            yield b'"test"}'
+
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_client.build_request = Mock()
 
         mock_response = AsyncMock()
         mock_response.status_code = 200
-        mock_response.headers = {"content-type": "application/json"}
-        mock_response.content = b'{"result": "test"}'
-        mock_client.request.return_value = mock_response
+        mock_response.headers = {
+            "content-type": "application/json",
+            "content-length": "18",
+            "x-request-id": "abc",
+        }
+        mock_response.aiter_raw = upstream_chunks
+        mock_client.send.return_value = mock_response
 
-        mock_request = AsyncMock()
+        mock_request = Mock()
         mock_request.method = "POST"
         mock_request.body = AsyncMock(return_value=b"test body")
         mock_request.headers = {"content-type": "application/json"}
+        mock_request.app.state.http_client = mock_client
 
         response = await _proxy_request(mock_request, "/test", False)
+        chunks = [chunk async for chunk in response.body_iterator]
 
         assert response.status_code == 200
-        mock_client.request.assert_called_once()
+        assert response.media_type == "application/json"
+        assert response.headers["content-length"] == "18"
+        assert response.headers["x-request-id"] == "abc"
+        assert chunks == [b'{"result": ', b'"test"}']
+        assert mock_client.build_request.call_args.kwargs["content"] == b"test body"
+        mock_client.send.assert_awaited_once_with(
+            mock_client.build_request.return_value, stream=True
+        )
+        mock_client.request.assert_not_called()
+        mock_response.aclose.assert_not_awaited()
+        await response.background()
+        mock_response.aclose.assert_awaited_once()
 
     @pytest.mark.unit
     @pytest.mark.asyncio
-    @patch("httpx.AsyncClient")
-    async def test_proxy_request_streaming(self, mock_client_class):
+    async def test_proxy_request_streaming(self):
         """Test streaming proxy request."""
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_client.build_request = Mock()
 
         mock_response = AsyncMock()
-        mock_response.aiter_bytes.return_value = [b"data: test\n"]
-        mock_client.stream.return_value.__aenter__.return_value = mock_response
+        mock_response.status_code = 200
+        mock_response.headers = {"content-type": "text/event-stream"}
+        mock_response.aiter_raw = Mock()
+        mock_client.send.return_value = mock_response
 
-        mock_request = AsyncMock()
+        mock_request = Mock()
         mock_request.method = "POST"
-        mock_request.body = AsyncMock(return_value=b"test body")
+        mock_request.stream = Mock(return_value=b"test body")
         mock_request.headers = {"content-type": "application/json"}
+        mock_request.app.state.http_client = mock_client
 
         response = await _proxy_request(mock_request, "/test", True)
 
@@ -118,19 +278,97 @@ class TestProxyRequest:
 
     @pytest.mark.unit
     @pytest.mark.asyncio
-    @patch("httpx.AsyncClient")
-    async def test_proxy_request_headers_cleanup(self, mock_client_class):
+    async def test_proxy_request_streaming_forwards_body_stream(self):
+        """Test that the request body is streamed upstream without buffering."""
+
+        async def upstream_chunks():
+            yield b"data: a\n\n"
+            yield b"data: b\n\n"
+
+        mock_response = AsyncMock()
+        mock_response.status_code = 200
+        mock_response.headers = {"content-type": "text/event-stream"}
+        mock_response.aiter_raw = upstream_chunks
+        mock_client = AsyncMock()
+        mock_client.build_request = Mock()
+        mock_client.send.return_value = mock_response
+
+        body_stream = Mock()
+        mock_request = Mock()
+        mock_request.method = "POST"
+        mock_request.stream = Mock(return_value=body_stream)
+        mock_request.headers = {"content-type": "application/json"}
+        mock_request.app.state.http_client = mock_client
+
+        response = await _proxy_request(mock_request, "/v1/completions", True)
+        chunks = [chunk async for chunk in response.body_iterator]
+
+        assert chunks == [b"data: a\n\n", b"data: b\n\n"]
+        assert mock_client.build_request.call_args.kwargs["content"] is body_stream
+        mock_client.send.assert_awaited_once_with(
+            mock_client.build_request.return_value, stream=True
+        )
+        await response.background()
+        mock_response.aclose.assert_awaited_once()
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_proxy_request_streaming_closes_unread_response(self):
+        """Test that the upstream response is closed even if no body is sent."""
+        mock_response = AsyncMock()
+        mock_response.status_code = 200
+        mock_response.headers = {"content-type": "text/event-stream"}
+        mock_response.aiter_raw = Mock()
+        mock_client = AsyncMock()
+        mock_client.build_request = Mock()
+        mock_client.send.return_value = mock_response
+
+        mock_request = Mock()
+        mock_request.method = "POST"
+        mock_request.headers = {"content-type": "application/json"}
+        mock_request.app.state.http_client = mock_client
+
+        response = await _proxy_request(mock_request, "/v1/completions", True)
+        await response.background()
+
+        mock_response.aclose.assert_awaited_once()
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_proxy_request_streaming_propagates_upstream_response(self):
+        """Test that upstream status and content type are passed through."""
+        mock_response = AsyncMock()
+        mock_response.status_code = 400
+        mock_response.headers = {"content-type": "application/json"}
+        mock_response.aiter_raw = Mock()
+        mock_client = AsyncMock()
+        mock_client.build_request = Mock()
+        mock_client.send.return_value = mock_response
+
+        mock_request = Mock()
+        mock_request.method = "POST"
+        mock_request.headers = {"content-type": "application/json"}
+        mock_request.app.state.http_client = mock_client
+
+        response = await _proxy_request(mock_request, "/v1/completions", True)
+
+        assert response.status_code == 400
+        assert response.media_type == "application/json"
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_proxy_request_headers_cleanup(self):
         """Test that headers are properly cleaned up."""
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_client.build_request = Mock()
 
         mock_response = AsyncMock()
         mock_response.status_code = 200
         mock_response.headers = {"content-type": "application/json"}
-        mock_response.content = b'{"result": "test"}'
-        mock_client.request.return_value = mock_response
+        mock_response.aiter_raw = Mock()
+        mock_client.send.return_value = mock_response
 
-        mock_request = AsyncMock()
+        mock_request = Mock()
         mock_request.method = "POST"
         mock_request.body = AsyncMock(return_value=b"test body")
         mock_request.headers = {
@@ -138,31 +376,34 @@ class TestProxyRequest:
             "authorization": "Bearer token",
             "host": "localhost:8080",
         }
+        mock_request.app.state.http_client = mock_client
 
         await _proxy_request(mock_request, "/test", False)
 
         # Verify headers were cleaned up
-        call_args = mock_client.request.call_args
+        call_args = mock_client.build_request.call_args
         headers = call_args[1]["headers"]
         assert "host" not in headers
         assert "authorization" in headers
 
     @pytest.mark.unit
     @pytest.mark.asyncio
-    @patch("httpx.AsyncClient")
-    async def test_streaming_response_format(self, mock_client_class):
+    async def test_streaming_response_format(self):
         """Test that streaming responses are properly formatted."""
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_client.build_request = Mock()
 
         mock_response = AsyncMock()
-        mock_response.aiter_bytes.return_value = [b"data: test\n"]
-        mock_client.stream.return_value.__aenter__.return_value = mock_response
+        mock_response.status_code = 200
+        mock_response.headers = {"content-type": "text/event-stream"}
+        mock_response.aiter_raw = Mock()
+        mock_client.send.return_value = mock_response
 
-        mock_request = AsyncMock()
+        mock_request = Mock()
         mock_request.method = "POST"
-        mock_request.body = AsyncMock(return_value=b"test body")
+        mock_request.stream = Mock(return_value=b"test body")
         mock_request.headers = {"content-type": "application/json"}
+        mock_request.app.state.http_client = mock_client
 
         response = await _proxy_request(mock_request, "/v1/chat/completions", True)
 
@@ -176,33 +417,479 @@ class TestProxyRequest:
 # TestFastAPIEndpoints class removed - functionality tested in live container tests
 
 
+class TestInvocations:
+    """Test the invocations endpoint"""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_invocations_invalid_json(self):
+        """Test that a malformed body is rejected with 400."""
+        mock_request = AsyncMock()
+        mock_request.body = AsyncMock(return_value=b"{not json")
+
+        with pytest.raises(HTTPException) as exc_info:
+            await invocations(mock_request)
+
+        assert exc_info.value.status_code == 400
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    @patch("app.main._proxy_request")
+    async def test_invocations_routes_chat_payload(self, mock_proxy):
+        """Test that a chat payload is parsed and routed to chat completions."""
+        mock_proxy.return_value = Response(status_code=200)
+        mock_request = AsyncMock()
+        mock_request.method = "POST"
+        mock_request.body = AsyncMock(
+            return_value=b'{"messages": [{"role": "user", "content": "Hi"}]}'
+        )
+
+        await invocations(mock_request)
+
+        mock_proxy.assert_called_once_with(
+            mock_request, "/v1/chat/completions", False, None
+        )
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    @patch("app.main._proxy_request")
+    async def test_passthrough_validates_chat_payload(self, mock_proxy):
+        """Test that chat completions bodies are decoded and validated."""
+        mock_request = AsyncMock()
+        mock_request.method = "POST"
+        mock_request.headers = {}
+        mock_request.body = AsyncMock(return_value=b'{"model": "x"}')
+
+        with pytest.raises(HTTPException) as exc_info:
+            await openai_passthrough("chat/completions", mock_request)
+
+        assert exc_info.value.status_code == 400
+        mock_proxy.assert_not_called()
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    @patch("app.main.orjson.loads")
+    @patch("app.main._proxy_request")
+    async def test_passthrough_skips_parse_for_other_paths(
+        self, mock_proxy, mock_loads
+    ):
+        """Test that unvalidated paths detect streaming without decoding JSON."""
+        mock_proxy.return_value = Response(status_code=200)
+        mock_request = AsyncMock()
+        mock_request.method = "POST"
+        mock_request.headers = {}
+        mock_request.body = AsyncMock(return_value=b'{"input": "Hi", "stream": true}')
+
+        await openai_passthrough("embeddings", mock_request)
+
+        mock_loads.assert_not_called()
+        mock_proxy.assert_called_once_with(mock_request, "/v1/embeddings", True, None)
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    @patch("app.main._proxy_request")
+    async def test_invocations_compresses_large_json(self, mock_proxy, async_client):
+        """Test that large JSON responses are gzipped when the client accepts it."""
+        payload = b'{"text": "' + b"a" * 4096 + b'"}'
+        mock_proxy.return_value = Response(
+            content=payload, media_type="application/json"
+        )
+
+        response = await async_client.post(
+            "/invocations",
+            json={"prompt": "Hi"},
+            headers={"Accept-Encoding": "gzip"},
+        )
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.content == payload
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    @patch("app.main._proxy_request")
+    async def test_invocations_does_not_compress_event_stream(
+        self, mock_proxy, async_client
+    ):
+        """Test that SSE responses are relayed without compression."""
+        payload = b"data: " + b"a" * 4096 + b"\n\n"
+        mock_proxy.return_value = Response(
+            content=payload, media_type="text/event-stream"
+        )
+
+        response = await async_client.post(
+            "/invocations",
+            json={"prompt": "Hi", "stream": True},
+            headers={"Accept-Encoding": "gzip"},
+        )
+
+        assert "content-encoding" not in response.headers
+        assert response.content == payload
+
+
+class TestResponseCache:
+    """Test caching of idempotent upstream responses"""
+
+    @pytest.fixture(autouse=True)
+    def clear_response_cache(self):
+        """Start every test with an empty, enabled response cache."""
+        _response_cache.clear()
+        with patch("app.main.RESPONSE_CACHE_SIZE", 16):
+            yield
+        _response_cache.clear()
+
+    @staticmethod
+    def _request(method, query="", authorization=None):
+        """Build the request attributes that _cache_key reads."""
+        headers = {"authorization": authorization} if authorization else {}
+        return SimpleNamespace(
+            method=method, headers=headers, url=SimpleNamespace(query=query)
+        )
+
+    @pytest.mark.unit
+    def test_cache_key_models_listing(self):
+        """Test that the model listing is cacheable."""
+        assert _cache_key(self._request("GET"), "/v1/models", None) is not None
+        assert _cache_key(self._request("GET"), "/v1/props", None) is None
+
+    @pytest.mark.unit
+    def test_cache_key_requires_deterministic_request(self):
+        """Test that only non-streaming temperature 0 requests are cacheable."""
+        post = self._request("POST")
+        body = {"prompt": "Hello", "temperature": 0}
+        assert _cache_key(post, "/v1/completions", body) is not None
+        assert _cache_key(post, "/v1/completions", {"prompt": "Hello"}) is None
+        assert _cache_key(post, "/v1/completions", {**body, "stream": True}) is None
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("temperature", [False, "0", None])
+    def test_cache_key_requires_numeric_temperature(self, temperature):
+        """Test that a non-numeric temperature is not treated as 0."""
+        body = {"prompt": "Hello", "temperature": temperature}
+        assert _cache_key(self._request("POST"), "/v1/completions", body) is None
+
+    @pytest.mark.unit
+    def test_cache_key_ignores_key_order(self):
+        """Test that equivalent bodies share a cache key."""
+        post = self._request("POST")
+        first = {"prompt": "Hello", "temperature": 0, "max_tokens": 8}
+        second = {"max_tokens": 8, "temperature": 0, "prompt": "Hello"}
+        assert _cache_key(post, "/v1/completions", first) == _cache_key(
+            post, "/v1/completions", second
+        )
+
+    @pytest.mark.unit
+    def test_cache_key_includes_credentials_and_query(self):
+        """Test that callers with other credentials or queries do not share keys."""
+        key = _cache_key(self._request("GET"), "/v1/models", None)
+        with_auth = _cache_key(
+            self._request("GET", authorization="Bearer a"), "/v1/models", None
+        )
+        other_auth = _cache_key(
+            self._request("GET", authorization="Bearer b"), "/v1/models", None
+        )
+        with_query = _cache_key(self._request("GET", query="x=1"), "/v1/models", None)
+
+        assert len({key, with_auth, other_auth, with_query}) == 4
+
+    @pytest.mark.unit
+    def test_cache_disabled(self):
+        """Test that a zero cache size disables caching."""
+        with patch("app.main.RESPONSE_CACHE_SIZE", 0):
+            assert _cache_key(self._request("GET"), "/v1/models", None) is None
+
+    @pytest.mark.unit
+    def test_cache_disabled_by_default(self):
+        """Test that the response cache is opt-in."""
+        with patch.dict("os.environ", {}, clear=True):
+            assert _load_config().RESPONSE_CACHE_SIZE == 0
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_proxy_request_serves_cache_hit(self):
+        """Test that a cached response skips the upstream call."""
+        mock_client = AsyncMock()
+        mock_response = AsyncMock()
+        mock_response.status_code = 200
+        mock_response.headers = {"content-type": "application/json"}
+        mock_response.content = b'{"object": "list"}'
+        mock_client.request.return_value = mock_response
+
+        mock_request = AsyncMock()
+        mock_request.method = "GET"
+        mock_request.body = AsyncMock(return_value=b"")
+        mock_request.headers = {}
+        mock_request.app.state.http_client = mock_client
+
+        key = _cache_key(self._request("GET"), "/v1/models", None)
+        first = await _proxy_request(mock_request, "/v1/models", False, key)
+        second = await _proxy_request(mock_request, "/v1/models", False, key)
+
+        mock_client.request.assert_called_once()
+        assert first.headers["x-cache"] == "MISS"
+        assert second.headers["x-cache"] == "HIT"
+        assert second.body == b'{"object": "list"}'
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_proxy_request_does_not_cache_errors(self):
+        """Test that failed upstream responses are not cached."""
+        mock_client = AsyncMock()
+        mock_response = AsyncMock()
+        mock_response.status_code = 503
+        mock_response.headers = {"content-type": "application/json"}
+        mock_response.content = b'{"error": "loading"}'
+        mock_client.request.return_value = mock_response
+
+        mock_request = AsyncMock()
+        mock_request.method = "GET"
+        mock_request.body = AsyncMock(return_value=b"")
+        mock_request.headers = {}
+        mock_request.app.state.http_client = mock_client
+
+        key = _cache_key(self._request("GET"), "/v1/models", None)
+        await _proxy_request(mock_request, "/v1/models", False, key)
+        await _proxy_request(mock_request, "/v1/models", False, key)
+
+        assert mock_client.request.call_count == 2
+        assert key not in _response_cache
+
+
 class TestLifespanManager:
     """Test the lifespan manager"""
 
     @pytest.mark.unit
     @pytest.mark.asyncio
+    @patch("app.main._wait_for_upstream")
+    @patch("app.main._upstream_accepts_connections", return_value=False)
+    @patch("app.main._try_acquire_spawn_lock")
     @patch("app.main.spawn_llama_server")
     @patch("app.main.prepare_model_and_get_path")
-    async def test_lifespan_startup(self, mock_prepare, mock_spawn):
-        """Test lifespan startup."""
+    async def test_lifespan_lifecycle(
+        self, mock_prepare, mock_spawn, mock_lock, mock_probe, mock_wait
+    ):
+        """Test lifespan startup and shutdown."""
         mock_prepare.return_value = "/path/to/model.gguf"
         mock_spawn.return_value = None
 
         async with lifespan(app):
             mock_prepare.assert_called_once()
             mock_spawn.assert_called_once_with("/path/to/model.gguf")
+            mock_wait.assert_awaited_once()
+            assert isinstance(app.state.http_client, httpx.AsyncClient)
+            assert not app.state.http_client.is_closed
+
+        assert app.state.http_client.is_closed
+        mock_lock.return_value.close.assert_called_once()
 
     @pytest.mark.unit
     @pytest.mark.asyncio
+    @patch("app.main._wait_for_upstream")
+    @patch("app.main._try_acquire_spawn_lock")
     @patch("app.main.spawn_llama_server")
     @patch("app.main.prepare_model_and_get_path")
-    async def test_lifespan_shutdown(self, mock_prepare, mock_spawn):
-        """Test lifespan shutdown."""
-        mock_prepare.return_value = "/path/to/model.gguf"
-        mock_spawn.return_value = None
+    async def test_lifespan_secondary_worker_waits_for_upstream(
+        self, mock_prepare, mock_spawn, mock_lock, mock_wait
+    ):
+        """Test that a worker without the spawn lock does not start llama-server."""
+        mock_lock.return_value = None
 
         async with lifespan(app):
-            pass  # Shutdown happens automatically
+            mock_prepare.assert_not_called()
+            mock_spawn.assert_not_called()
+            mock_wait.assert_awaited_once()
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    @patch("app.main._wait_for_upstream")
+    @patch("app.main._upstream_accepts_connections", return_value=True)
+    @patch("app.main._try_acquire_spawn_lock")
+    @patch("app.main.spawn_llama_server")
+    @patch("app.main.prepare_model_and_get_path")
+    async def test_lifespan_reuses_running_upstream(
+        self, mock_prepare, mock_spawn, mock_lock, mock_probe, mock_wait
+    ):
+        """Test that the lock holder adopts a llama-server left by a dead worker."""
+        async with lifespan(app):
+            mock_prepare.assert_not_called()
+            mock_spawn.assert_not_called()
+            mock_wait.assert_not_awaited()
+
+    @pytest.mark.unit
+    def test_spawn_lock_held_by_one_worker(self, tmp_path):
+        """Test that the spawn lock is not granted while another worker holds it."""
+        with patch("app.main.LLAMA_SERVER_LOCK", str(tmp_path / "llama.lock")):
+            owner = _try_acquire_spawn_lock()
+            try:
+                assert owner is not None
+                assert _try_acquire_spawn_lock() is None
+            finally:
+                owner.close()
+
+            again = _try_acquire_spawn_lock()
+            assert again is not None
+            again.close()
+
+    @pytest.mark.unit
+    def test_lifespan_client_serves_ping(self, fastapi_client_with_lifespan):
+        """Test that the app serves requests once the lifespan has started."""
+        response = fastapi_client_with_lifespan.get("/ping")
+
+        assert response.status_code == 200
+        assert isinstance(app.state.http_client, httpx.AsyncClient)
+
+
+class TestWarmup:
+    """Test the llama-server warmup request"""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_warmup_retries_while_loading(self):
+        """Test that warmup retries while llama-server is still loading."""
+        mock_client = AsyncMock()
+        mock_client.post.side_effect = [Mock(status_code=503), Mock(status_code=200)]
+
+        with patch("app.main.asyncio.sleep", new=AsyncMock()):
+            await _warmup_llama_server(mock_client)
+
+        assert mock_client.post.await_count == 2
+        assert mock_client.post.call_args.kwargs["json"]["max_tokens"] == 1
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_warmup_swallows_errors(self, capsys):
+        """Test that a failed warmup does not abort startup."""
+        mock_client = AsyncMock()
+        mock_client.post.side_effect = httpx.ConnectError("refused")
+
+        await _warmup_llama_server(mock_client)
+
+        assert "Warmup request failed" in capsys.readouterr().out
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    @patch("app.main._warmup_llama_server")
+    @patch("app.main._wait_for_upstream")
+    @patch("app.main._upstream_accepts_connections", return_value=False)
+    @patch("app.main._try_acquire_spawn_lock")
+    @patch("app.main.spawn_llama_server")
+    @patch("app.main.prepare_model_and_get_path")
+    async def test_lifespan_runs_warmup_when_enabled(
+        self, mock_prepare, mock_spawn, mock_lock, mock_probe, mock_wait, mock_warmup
+    ):
+        """Test that the owning worker warms up llama-server when WARMUP=1."""
+        with patch("app.main.WARMUP", True):
+            async with lifespan(app):
+                mock_warmup.assert_awaited_once_with(app.state.http_client)
+
+
+class TestTerminateLlamaServer:
+    """Test stopping the llama-server process group"""
+
+    @staticmethod
+    def _is_running(pid):
+        """Return whether pid exists and is not a zombie."""
+        try:
+            return Path(f"/proc/{pid}/stat").read_text().split()[2] != "Z"
+        except FileNotFoundError:
+            return False
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_terminate_stops_process_group(self):
+        """Test that children of llama-server are stopped along with it."""
+        proc = await asyncio.create_subprocess_exec(
+            "sh",
+            "-c",
+            "sleep 30 & echo $!; wait",
+            stdout=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        child_pid = int(await proc.stdout.readline())
+
+        await _terminate_llama_server(proc)
+
+        assert proc.returncode is not None
+        for _ in range(50):
+            if not self._is_running(child_pid):
+                break
+            await asyncio.sleep(0.02)
+        assert not self._is_running(child_pid)
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_terminate_cancels_log_tasks(self):
+        """Test that log pump tasks still running are cancelled."""
+        proc = await asyncio.create_subprocess_exec(
+            "sleep", "30", start_new_session=True
+        )
+        task = asyncio.create_task(asyncio.Event().wait())
+        _log_tasks.add(task)
+        task.add_done_callback(_log_tasks.discard)
+
+        await _terminate_llama_server(proc)
+
+        assert task.cancelled()
+        assert task not in _log_tasks
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_terminate_kills_after_timeout(self):
+        """Test that a process group ignoring SIGTERM is killed."""
+        proc = await asyncio.create_subprocess_exec(
+            "sh",
+            "-c",
+            'trap "" TERM; echo ready; sleep 30',
+            stdout=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        await proc.stdout.readline()
+
+        await _terminate_llama_server(proc, timeout=0.2)
+
+        assert proc.returncode == -signal.SIGKILL
+
+
+class TestWaitForUpstream:
+    """Test the _wait_for_upstream readiness probe"""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_wait_for_upstream_ready(self):
+        """Test that the probe returns once the port accepts connections."""
+        server = await asyncio.start_server(
+            lambda r, w: w.close(), host="127.0.0.1", port=0
+        )
+        port = server.sockets[0].getsockname()[1]
+        try:
+            with patch("app.main.UPSTREAM_PORT", port):
+                await _wait_for_upstream(timeout=2.0)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_wait_for_upstream_process_exited(self):
+        """Test that the probe fails fast when llama-server has exited."""
+        exited_proc = Mock()
+        exited_proc.returncode = 1
+
+        with patch("app.main.llama_proc", exited_proc):
+            with pytest.raises(RuntimeError, match="exited with code 1"):
+                await _wait_for_upstream(timeout=10.0)
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_wait_for_upstream_timeout(self):
+        """Test that the probe raises when nothing is listening."""
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        sock.close()
+
+        with patch("app.main.UPSTREAM_PORT", port):
+            with pytest.raises(RuntimeError, match="llama-server not reachable"):
+                await _wait_for_upstream(timeout=0.2, interval=0.05)
 
 
 class TestEnvironmentVariables:
@@ -212,11 +899,11 @@ class TestEnvironmentVariables:
     def test_default_port_configuration(self):
         """Test default port configuration."""
         with patch.dict("os.environ", {}, clear=True):
-            from app.main import APP_PORT, UPSTREAM_HOST, UPSTREAM_PORT
+            config = _load_config()
 
-            assert APP_PORT == 8080
-            assert UPSTREAM_PORT == 8081
-            assert UPSTREAM_HOST == "127.0.0.1"
+        assert config.APP_PORT == 8080
+        assert config.UPSTREAM_PORT == 8081
+        assert config.UPSTREAM_HOST == "127.0.0.1"
 
     @pytest.mark.unit
     def test_custom_port_configuration(self):
@@ -225,13 +912,8 @@ class TestEnvironmentVariables:
             "os.environ",
             {"PORT": "9000", "UPSTREAM_PORT": "9001", "UPSTREAM_HOST": "0.0.0.0"},
         ):
-            # Reload the module to get new environment values
-            import importlib
-
-            import app.main
-
-            importlib.reload(app.main)
+            config = _load_config()
 
-            assert app.main.APP_PORT == 9000
-            assert app.main.UPSTREAM_PORT == 9001
-            assert app.main.UPSTREAM_HOST == "0.0.0.0"
+        assert config.APP_PORT == 9000
+        assert config.UPSTREAM_PORT == 9001
+        assert config.UPSTREAM_HOST == "0.0.0.0"
@@ -5,14 +5,17 @@ This module contains unit tests for all functions in app.model_manager.py,
 including model preparation, conversion, quantization, and utility functions.
 """
 
+import importlib.util
 import os
 import subprocess
 from pathlib import Path
-from unittest.mock import MagicMock, Mock, patch
+from types import SimpleNamespace
+from unittest.mock import ANY, MagicMock, Mock, patch
 
 import pytest
 
 from app.model_manager import (
+    DOWNLOAD_COMPLETE_MARKER,
     LLAMACPP_DIR,
     MODELS_DIR,
     _convert_hf_to_gguf,
@@ -28,20 +31,29 @@ from app.model_manager import (
 class TestFindQuantizeBinary:
     """Test the _find_quantize_binary function."""
 
+    @pytest.fixture(scope="class")
+    def which_mock(self):
+        """Patch shutil.which once for the whole class."""
+        with patch("shutil.which") as mock_which:
+            yield mock_which
+
+    @pytest.fixture(autouse=True)
+    def reset_which_mock(self, which_mock):
+        """Clear calls and return value left by the previous test."""
+        which_mock.reset_mock(return_value=True)
+
     @pytest.mark.unit
-    @patch("shutil.which")
-    def test_find_quantize_binary_found(self, mock_which):
+    def test_find_quantize_binary_found(self, which_mock):
         """Test finding quantize binary when it exists."""
-        mock_which.return_value = "/usr/bin/llama-quantize"
+        which_mock.return_value = "/usr/bin/llama-quantize"
         result = _find_quantize_binary()
         assert result == "/usr/bin/llama-quantize"
-        mock_which.assert_called_once_with("llama-quantize")
+        which_mock.assert_called_once_with("llama-quantize")
 
     @pytest.mark.unit
-    @patch("shutil.which")
-    def test_find_quantize_binary_not_found(self, mock_which):
+    def test_find_quantize_binary_not_found(self, which_mock):
         """Test finding quantize binary when it doesn't exist."""
-        mock_which.return_value = None
+        which_mock.return_value = None
         result = _find_quantize_binary()
         assert result is None
 
@@ -49,20 +61,29 @@ class TestFindQuantizeBinary:
 class TestFindConvertScript:
     """Test the _find_convert_script function."""
 
+    @pytest.fixture(scope="class")
+    def exists_mock(self):
+        """Patch Path.exists once for the whole class."""
+        with patch("pathlib.Path.exists") as mock_exists:
+            yield mock_exists
+
+    @pytest.fixture(autouse=True)
+    def reset_exists_mock(self, exists_mock):
+        """Clear calls and return value left by the previous test."""
+        exists_mock.reset_mock(return_value=True)
+
     @pytest.mark.unit
-    @patch("pathlib.Path.exists")
-    def test_find_convert_script_found(self, mock_exists):
+    def test_find_convert_script_found(self, exists_mock):
         """Test finding convert script when it exists."""
-        mock_exists.return_value = True
+        exists_mock.return_value = True
         result = _find_convert_script()
         expected_path = LLAMACPP_DIR / "convert_hf_to_gguf.py"
         assert result == expected_path
 
     @pytest.mark.unit
-    @patch("pathlib.Path.exists")
-    def test_find_convert_script_not_found(self, mock_exists):
+    def test_find_convert_script_not_found(self, exists_mock):
         """Test finding convert script when it doesn't exist."""
-        mock_exists.return_value = False
+        exists_mock.return_value = False
         result = _find_convert_script()
         assert result is None
 
@@ -75,12 +96,12 @@ class TestConvertHfToGguf:
     @patch("subprocess.run")
     @patch("pathlib.Path.mkdir")
     def test_convert_hf_to_gguf_success(
-        self, mock_mkdir, mock_run, mock_find_script, temp_dir
+        self, mock_mkdir, mock_run, mock_find_script, tmp_path
     ):
         """Test successful HuggingFace to GGUF conversion."""
-        source_dir = temp_dir / "source"
-        out_dir = temp_dir / "output"
-        script_path = temp_dir / "convert_hf_to_gguf.py"
+        source_dir = tmp_path / "source"
+        out_dir = tmp_path / "output"
+        script_path = tmp_path / "convert_hf_to_gguf.py"
 
         mock_find_script.return_value = script_path
         mock_run.return_value = Mock(returncode=0)
@@ -95,13 +116,14 @@ class TestConvertHfToGguf:
 
         # Check the command arguments
         call_args = mock_run.call_args[0][0]
-        assert call_args[0] == "/opt/venv/bin/python3"
-        assert call_args[1] == str(script_path)
-        assert "--outtype" in call_args
-        assert "f16" in call_args
-        assert "--outfile" in call_args
-        assert str(expected_outfile) in call_args
-        assert str(source_dir) in call_args
+        assert tuple(call_args[:2]) == ("/opt/venv/bin/python3", str(script_path))
+        assert {
+            "--outtype",
+            "f16",
+            "--outfile",
+            str(expected_outfile),
+            str(source_dir),
+        } <= set(call_args)
 
     @pytest.mark.unit
     @patch("app.model_manager._find_convert_script")
@@ -117,12 +139,12 @@ class TestConvertHfToGguf:
     @patch("subprocess.run")
     @patch("pathlib.Path.mkdir")
     def test_convert_hf_to_gguf_subprocess_failure(
-        self, mock_mkdir, mock_run, mock_find_script, temp_dir
+        self, mock_mkdir, mock_run, mock_find_script, tmp_path
     ):
         """Test error when subprocess conversion fails."""
-        source_dir = temp_dir / "source"
-        out_dir = temp_dir / "output"
-        script_path = temp_dir / "convert_hf_to_gguf.py"
+        source_dir = tmp_path / "source"
+        out_dir = tmp_path / "output"
+        script_path = tmp_path / "convert_hf_to_gguf.py"
 
         mock_find_script.return_value = script_path
         mock_run.side_effect = subprocess.CalledProcessError(1, "convert_script")
@@ -134,157 +156,110 @@ class TestConvertHfToGguf:
 class TestQuantizeGguf:
     """Test the _quantize_gguf function."""
 
-    @pytest.mark.unit
-    @patch("app.model_manager._find_quantize_binary")
-    @patch("subprocess.run")
-    def test_quantize_gguf_success(self, mock_run, mock_find_binary, temp_dir):
-        """Test successful GGUF quantization."""
-        src_path = temp_dir / "model.gguf"
-        qtype = "q4_k_m"
-
-        mock_find_binary.return_value = "/usr/bin/llama-quantize"
-        mock_run.return_value = Mock(returncode=0)
-
-        result = _quantize_gguf(src_path, qtype)
-
-        expected_out_path = temp_dir / "model.q4_k_m.gguf"
-        assert result == expected_out_path
+    @pytest.fixture
+    def quantize_env(self):
+        """Provide a found quantize binary and a successful subprocess.run."""
+        with patch(
+            "app.model_manager._find_quantize_binary",
+            return_value="/usr/bin/llama-quantize",
+        ) as mock_find_binary, patch(
+            "subprocess.run", return_value=Mock(returncode=0)
+        ) as mock_run:
+            yield mock_run, mock_find_binary
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        "name,qtype,expected",
+        [
+            ("model.gguf", "q4_k_m", "model.q4_k_m.gguf"),
+            ("complex-model-name.f16.gguf", "q8_0", "complex-model-name.f16.q8_0.gguf"),
+        ],
+    )
+    def test_quantize_gguf(self, quantize_env, tmp_path, name, qtype, expected):
+        """Test successful GGUF quantization and output file naming."""
+        mock_run, _ = quantize_env
+        src_path = tmp_path / name
+        expected_out_path = tmp_path / expected
+
+        assert _quantize_gguf(src_path, qtype) == expected_out_path
 
         mock_run.assert_called_once()
 
         # Check the command arguments
         call_args = mock_run.call_args[0][0]
-        assert call_args[0] == "/usr/bin/llama-quantize"
-        assert call_args[1] == str(src_path)
-        assert call_args[2] == str(expected_out_path)
-        assert call_args[3] == qtype
+        assert tuple(call_args[:4]) == (
+            "/usr/bin/llama-quantize",
+            str(src_path),
+            str(expected_out_path),
+            qtype,
+        )
 
     @pytest.mark.unit
-    @patch("app.model_manager._find_quantize_binary")
-    def test_quantize_gguf_binary_not_found(self, mock_find_binary):
+    def test_quantize_gguf_binary_not_found(self, quantize_env):
         """Test error when quantize binary is not found."""
+        _, mock_find_binary = quantize_env
         mock_find_binary.return_value = None
 
         with pytest.raises(RuntimeError, match="llama-quantize binary not found"):
             _quantize_gguf(Path("/model.gguf"), "q4_k_m")
 
     @pytest.mark.unit
-    @patch("app.model_manager._find_quantize_binary")
-    @patch("subprocess.run")
-    def test_quantize_gguf_subprocess_failure(
-        self, mock_run, mock_find_binary, temp_dir
-    ):
+    def test_quantize_gguf_subprocess_failure(self, quantize_env, tmp_path):
         """Test error when subprocess quantization fails."""
-        src_path = temp_dir / "model.gguf"
-        qtype = "q4_k_m"
-
-        mock_find_binary.return_value = "/usr/bin/llama-quantize"
+        mock_run, _ = quantize_env
         mock_run.side_effect = subprocess.CalledProcessError(1, "quantize")
 
         with pytest.raises(subprocess.CalledProcessError):
-            _quantize_gguf(src_path, qtype)
-
-    @pytest.mark.unit
-    @patch("app.model_manager._find_quantize_binary")
-    @patch("subprocess.run")
-    def test_quantize_gguf_filename_handling(
-        self, mock_run, mock_find_binary, temp_dir
-    ):
-        """Test quantization with different filename patterns."""
-        src_path = temp_dir / "complex-model-name.f16.gguf"
-        qtype = "q8_0"
-
-        mock_find_binary.return_value = "/usr/bin/llama-quantize"
-        mock_run.return_value = Mock(returncode=0)
-
-        result = _quantize_gguf(src_path, qtype)
-
-        expected_out_path = temp_dir / "complex-model-name.f16.q8_0.gguf"
-        assert result == expected_out_path
+            _quantize_gguf(tmp_path / "model.gguf", "q4_k_m")
 
 
 class TestLooksLikeHfRepo:
     """Test the _looks_like_hf_repo function."""
 
     @pytest.mark.unit
-    def test_looks_like_hf_repo_with_config_json(self, temp_dir):
+    def test_looks_like_hf_repo_with_config_json(self, fs):
         """Test that a directory with config.json is recognized as HF repo."""
-        model_dir = temp_dir / "test-model"
-        model_dir.mkdir()
-        (model_dir / "config.json").touch()
-
-        # Mock the exists method on Path instances
-        original_exists = Path.exists
-
-        def mock_exists(self):
-            return str(self).endswith("config.json")
+        fs.create_file("/models/test-model/config.json")
 
-        Path.exists = mock_exists
-
-        try:
-            result = _looks_like_hf_repo(model_dir)
-            assert result is True
-        finally:
-            Path.exists = original_exists
+        assert _looks_like_hf_repo(Path("/models/test-model")) is True
 
     @pytest.mark.unit
-    def test_looks_like_hf_repo_with_safetensors(self, temp_dir):
+    def test_looks_like_hf_repo_with_safetensors(self, fs):
         """Test that a directory with safetensors files is recognized as HF repo."""
-        model_dir = temp_dir / "test-model"
-        model_dir.mkdir()
-        (model_dir / "model.safetensors").touch()
-
-        # Mock the exists method on Path instances
-        original_exists = Path.exists
-
-        def mock_exists(self):
-            return str(self).endswith("config.json")
-
-        Path.exists = mock_exists
+        fs.create_file("/models/test-model/model.safetensors")
 
-        try:
-            with patch("pathlib.Path.glob") as mock_glob:
-                mock_glob.return_value = [model_dir / "model.safetensors"]
-                result = _looks_like_hf_repo(model_dir)
-                assert result is True
-        finally:
-            Path.exists = original_exists
+        assert _looks_like_hf_repo(Path("/models/test-model")) is True
 
     @pytest.mark.unit
-    def test_looks_like_hf_repo_invalid(self, temp_dir):
+    def test_looks_like_hf_repo_invalid(self, fs):
         """Test that a directory without HF files is not recognized as HF repo."""
-        model_dir = temp_dir / "test-model"
-        model_dir.mkdir()
-        (model_dir / "random.txt").touch()
-
-        # Mock the exists method on Path instances
-        original_exists = Path.exists
-
-        def mock_exists(self):
-            return False
-
-        Path.exists = mock_exists
+        fs.create_file("/models/test-model/random.txt")
 
-        try:
-            with patch("pathlib.Path.glob") as mock_glob:
-                mock_glob.return_value = []
-                result = _looks_like_hf_repo(model_dir)
-                assert result is False
-        finally:
-            Path.exists = original_exists
+        assert _looks_like_hf_repo(Path("/models/test-model")) is False
 
 
 class TestPrepareModelAndGetPath:
     """Test the prepare_model_and_get_path function."""
 
-    @pytest.mark.unit
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.rename")
-    @patch("app.model_manager.download_hf")
-    def test_prepare_model_gguf_filename(
-        self, mock_download, mock_rename, mock_exists, mock_mkdir, temp_dir
-    ):
+    @pytest.fixture(autouse=True)
+    def path_mocks(self, tmp_path):
+        """Keep model preparation off the filesystem.
+
+        touch is patched too so the download marker is not written, as
+        mkdir is mocked out. Depends on tmp_path so the temporary directory
+        is created before Path is patched.
+        """
+        with patch("pathlib.Path.mkdir") as mkdir, patch(
+            "pathlib.Path.exists"
+        ) as exists, patch("pathlib.Path.rename") as rename, patch(
+            "pathlib.Path.touch"
+        ) as touch:
+            yield SimpleNamespace(
+                mkdir=mkdir, exists=exists, rename=rename, touch=touch
+            )
+
+    @pytest.mark.unit
+    def test_prepare_model_gguf_filename(self, path_mocks, tmp_path):
         """Test model preparation with existing GGUF filename."""
         # Mock environment
         with patch.dict(
@@ -292,27 +267,21 @@ class TestPrepareModelAndGetPath:
             {"MODEL_FILENAME": "test_model.gguf", "HF_MODEL_ID": "test/model"},
         ):
             # Mock file existence - assume files exist for this test
-            mock_exists.return_value = True
+            path_mocks.exists.return_value = True
 
-            with patch("app.model_manager.MODELS_DIR", temp_dir):
+            with patch("app.model_manager.MODELS_DIR", tmp_path):
                 result = prepare_model_and_get_path()
-                expected_path = str(temp_dir / "current" / "test_model.gguf")
+                expected_path = str(tmp_path / "current" / "test_model.gguf")
                 assert result == expected_path
 
     @pytest.mark.unit
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.rename")
-    @patch("app.model_manager.download_hf")
-    def test_prepare_model_gguf_filename_not_found(
-        self, mock_download, mock_rename, mock_exists, mock_mkdir
-    ):
+    def test_prepare_model_gguf_filename_not_found(self, path_mocks):
         """Test error when specified GGUF filename is not found."""
         with patch.dict(
             "os.environ",
             {"MODEL_FILENAME": "missing_model.gguf", "HF_MODEL_ID": "test/model"},
         ):
-            mock_exists.return_value = False
+            path_mocks.exists.return_value = False
 
             with patch("app.model_manager.MODELS_DIR", Path("/tmp")):
                 with pytest.raises(
@@ -322,10 +291,6 @@ class TestPrepareModelAndGetPath:
                     prepare_model_and_get_path()
 
     @pytest.mark.unit
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.rename")
-    @patch("app.model_manager.download_hf")
     @patch("app.model_manager._looks_like_hf_repo")
     @patch("app.model_manager._convert_hf_to_gguf")
     @patch("app.model_manager._quantize_gguf")
@@ -334,47 +299,32 @@ class TestPrepareModelAndGetPath:
         mock_quantize,
         mock_convert,
         mock_looks_like,
-        mock_download,
-        mock_rename,
-        mock_exists,
-        mock_mkdir,
-        temp_dir,
+        path_mocks,
+        tmp_path,
         mock_models_dir,
     ):
         """Test model preparation with HF conversion."""
 
         # Mock file existence - no current model exists
-        def mock_exists_func(self):
-            return False
+        path_mocks.exists.return_value = False
 
-        # Mock the exists method on Path instances
-        original_exists = Path.exists
-        Path.exists = mock_exists_func
+        # Mock HF repo detection
+        mock_looks_like.return_value = True
 
-        try:
-            # Mock HF repo detection
-            mock_looks_like.return_value = True
+        # Mock conversion
+        converted_file = tmp_path / "converted.gguf"
+        mock_convert.return_value = converted_file
 
-            # Mock conversion
-            converted_file = temp_dir / "converted.gguf"
-            mock_convert.return_value = converted_file
-
-            with patch.dict("os.environ", {"HF_MODEL_ID": "test/model"}):
-                result = prepare_model_and_get_path()
+        with patch.dict("os.environ", {"HF_MODEL_ID": "test/model"}):
+            result = prepare_model_and_get_path()
 
-                # Verify conversion was called
-                mock_convert.assert_called_once()
+            # Verify conversion was called
+            mock_convert.assert_called_once()
 
-                # Verify result
-                assert result == str(converted_file)
-        finally:
-            Path.exists = original_exists
+            # Verify result
+            assert result == str(converted_file)
 
     @pytest.mark.unit
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.rename")
-    @patch("app.model_manager.download_hf")
     @patch("app.model_manager._looks_like_hf_repo")
     @patch("app.model_manager._convert_hf_to_gguf")
     @patch("app.model_manager._quantize_gguf")
@@ -383,59 +333,43 @@ class TestPrepareModelAndGetPath:
         mock_quantize,
         mock_convert,
         mock_looks_like,
-        mock_download,
-        mock_rename,
-        mock_exists,
-        mock_mkdir,
-        temp_dir,
+        path_mocks,
+        tmp_path,
         mock_models_dir,
     ):
         """Test model preparation with HF conversion and quantization."""
 
         # Mock file existence - no current model exists
-        def mock_exists_func(self):
-            return False
+        path_mocks.exists.return_value = False
 
-        # Mock the exists method on Path instances
-        original_exists = Path.exists
-        Path.exists = mock_exists_func
+        # Mock HF repo detection
+        mock_looks_like.return_value = True
 
-        try:
-            # Mock HF repo detection
-            mock_looks_like.return_value = True
+        # Mock conversion and quantization
+        converted_file = tmp_path / "converted.gguf"
+        quantized_file = tmp_path / "converted.Q4_K_M.gguf"
+        mock_convert.return_value = converted_file
+        mock_quantize.return_value = quantized_file
 
-            # Mock conversion and quantization
-            converted_file = temp_dir / "converted.gguf"
-            quantized_file = temp_dir / "converted.Q4_K_M.gguf"
-            mock_convert.return_value = converted_file
-            mock_quantize.return_value = quantized_file
+        with patch.dict(
+            "os.environ", {"HF_MODEL_ID": "test/model", "QUANTIZATION": "Q4_K_M"}
+        ):
+            result = prepare_model_and_get_path()
 
-            with patch.dict(
-                "os.environ", {"HF_MODEL_ID": "test/model", "QUANTIZATION": "Q4_K_M"}
-            ):
-                result = prepare_model_and_get_path()
+            # Verify conversion was called
+            mock_convert.assert_called_once()
 
-                # Verify conversion was called
-                mock_convert.assert_called_once()
+            # Verify quantization was called
+            mock_quantize.assert_called_once_with(converted_file, "Q4_K_M")
 
-                # Verify quantization was called
-                mock_quantize.assert_called_once_with(converted_file, "Q4_K_M")
-
-                # Verify result
-                assert result == str(quantized_file)
-        finally:
-            Path.exists = original_exists
+            # Verify result
+            assert result == str(quantized_file)
 
     @pytest.mark.unit
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.rename")
-    def test_prepare_model_no_source_provided(
-        self, mock_rename, mock_exists, mock_mkdir
-    ):
+    def test_prepare_model_no_source_provided(self, path_mocks):
         """Test error when no model source is provided."""
         with patch.dict("os.environ", {}, clear=True):
-            mock_exists.return_value = False
+            path_mocks.exists.return_value = False
 
             with patch("app.model_manager.MODELS_DIR", Path("/tmp")):
                 with pytest.raises(
@@ -445,17 +379,11 @@ class TestPrepareModelAndGetPath:
                     prepare_model_and_get_path()
 
     @pytest.mark.unit
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.rename")
-    @patch("app.model_manager.download_hf")
     @patch("app.model_manager._looks_like_hf_repo")
-    def test_prepare_model_no_usable_model(
-        self, mock_looks_like, mock_download, mock_rename, mock_exists, mock_mkdir
-    ):
+    def test_prepare_model_no_usable_model(self, mock_looks_like, path_mocks):
         """Test error when no usable model is found."""
         with patch.dict("os.environ", {"HF_MODEL_ID": "test/model"}):
-            mock_exists.return_value = False
+            path_mocks.exists.return_value = False
             mock_looks_like.return_value = False
 
             with patch("app.model_manager.MODELS_DIR", Path("/tmp")):
@@ -463,12 +391,9 @@ class TestPrepareModelAndGetPath:
                     prepare_model_and_get_path()
 
     @pytest.mark.unit
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.rename")
     @patch("app.model_manager.download_s3")
     def test_prepare_model_s3_source_with_model_filename(
-        self, mock_download_s3, mock_rename, mock_exists, mock_mkdir, temp_dir
+        self, mock_download_s3, path_mocks, tmp_path
     ):
         """Test model preparation with S3 source and MODEL_FILENAME."""
         with patch.dict(
@@ -490,37 +415,32 @@ class TestPrepareModelAndGetPath:
                 # Any additional calls return True
                 return True
 
-            mock_exists.side_effect = mock_exists_side_effect
+            path_mocks.exists.side_effect = mock_exists_side_effect
 
-            with patch("app.model_manager.MODELS_DIR", temp_dir):
+            with patch("app.model_manager.MODELS_DIR", tmp_path):
                 result = prepare_model_and_get_path()
-                expected_path = str(temp_dir / "current" / "test.gguf")
+                expected_path = str(tmp_path / "current" / "test.gguf")
                 assert result == expected_path
 
                 mock_download_s3.assert_called_once()
 
     @pytest.mark.unit
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.rename")
     @patch("app.model_manager.download_s3")
     @patch("app.model_manager._detect_model_type_from_s3_uri")
     def test_prepare_model_s3_source_missing_model_filename(
         self,
         mock_detect_type,
         mock_download_s3,
-        mock_rename,
-        mock_exists,
-        mock_mkdir,
-        temp_dir,
+        path_mocks,
+        tmp_path,
     ):
         """Test error when MODEL_FILENAME is missing for GGUF S3 source."""
         with patch.dict("os.environ", {"HF_MODEL_URI": "s3://bucket/model/"}):
             # Mock detection to return gguf so it requires MODEL_FILENAME
             mock_detect_type.return_value = "gguf"
-            mock_exists.return_value = False
+            path_mocks.exists.return_value = False
 
-            with patch("app.model_manager.MODELS_DIR", temp_dir):
+            with patch("app.model_manager.MODELS_DIR", tmp_path):
                 with pytest.raises(
                     RuntimeError,
                     match="MODEL_FILENAME is required for GGUF downloads from S3",
@@ -531,9 +451,6 @@ class TestPrepareModelAndGetPath:
                 mock_download_s3.assert_not_called()
 
     @pytest.mark.unit
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.rename")
     @patch("app.model_manager.download_s3")
     @patch("app.model_manager._detect_model_type_from_s3_uri")
     @patch("app.model_manager._looks_like_hf_repo")
@@ -544,10 +461,8 @@ class TestPrepareModelAndGetPath:
         mock_looks_like,
         mock_detect_type,
         mock_download_s3,
-        mock_rename,
-        mock_exists,
-        mock_mkdir,
-        temp_dir,
+        path_mocks,
+        tmp_path,
     ):
         """Test safetensors model from S3 without MODEL_FILENAME."""
         with patch.dict(
@@ -565,16 +480,16 @@ class TestPrepareModelAndGetPath:
                 # First call: model_root.exists() returns False (no current model)
                 return False
 
-            mock_exists.side_effect = mock_exists_side_effect
+            path_mocks.exists.side_effect = mock_exists_side_effect
 
             # Mock HF repo detection
             mock_looks_like.return_value = True
 
             # Mock conversion
-            converted_file = temp_dir / "converted.gguf"
+            converted_file = tmp_path / "converted.gguf"
             mock_convert.return_value = converted_file
 
-            with patch("app.model_manager.MODELS_DIR", temp_dir):
+            with patch("app.model_manager.MODELS_DIR", tmp_path):
                 result = prepare_model_and_get_path()
 
                 # Should succeed without MODEL_FILENAME
@@ -586,28 +501,23 @@ class TestPrepareModelAndGetPath:
                 assert result == str(converted_file)
 
     @pytest.mark.unit
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.rename")
     @patch("app.model_manager.download_s3")
     @patch("app.model_manager._detect_model_type_from_s3_uri")
     def test_prepare_model_s3_gguf_without_model_filename_fails(
         self,
         mock_detect_type,
         mock_download_s3,
-        mock_rename,
-        mock_exists,
-        mock_mkdir,
-        temp_dir,
+        path_mocks,
+        tmp_path,
     ):
         """Test GGUF model from S3 without MODEL_FILENAME fails."""
         with patch.dict("os.environ", {"HF_MODEL_URI": "s3://bucket/gguf-model/"}):
             # Mock detection to return gguf
             mock_detect_type.return_value = "gguf"
 
-            mock_exists.return_value = False
+            path_mocks.exists.return_value = False
 
-            with patch("app.model_manager.MODELS_DIR", temp_dir):
+            with patch("app.model_manager.MODELS_DIR", tmp_path):
                 with pytest.raises(
                     RuntimeError,
                     match="MODEL_FILENAME is required for GGUF downloads from S3",
@@ -618,9 +528,6 @@ class TestPrepareModelAndGetPath:
                 mock_download_s3.assert_not_called()
 
     @pytest.mark.unit
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.rename")
     @patch("app.model_manager.download_s3")
     @patch("app.model_manager._detect_model_type_from_s3_uri")
     @patch("app.model_manager._looks_like_hf_repo")
@@ -631,10 +538,8 @@ class TestPrepareModelAndGetPath:
         mock_looks_like,
         mock_detect_type,
         mock_download_s3,
-        mock_rename,
-        mock_exists,
-        mock_mkdir,
-        temp_dir,
+        path_mocks,
+        tmp_path,
         capsys,
     ):
         """Test unknown model type from S3 without MODEL_FILENAME shows warning."""
@@ -643,16 +548,16 @@ class TestPrepareModelAndGetPath:
             mock_detect_type.return_value = "unknown"
 
             # Mock file existence - model doesn't exist initially, then we have HF repo
-            mock_exists.return_value = False
+            path_mocks.exists.return_value = False
 
             # Mock HF repo detection
             mock_looks_like.return_value = True
 
             # Mock conversion
-            converted_file = temp_dir / "converted.gguf"
+            converted_file = tmp_path / "converted.gguf"
             mock_convert.return_value = converted_file
 
-            with patch("app.model_manager.MODELS_DIR", temp_dir):
+            with patch("app.model_manager.MODELS_DIR", tmp_path):
                 result = prepare_model_and_get_path()
 
                 # Should succeed with warning
@@ -667,10 +572,6 @@ class TestPrepareModelAndGetPath:
                 assert result == str(converted_file)
 
     @pytest.mark.unit
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.rename")
-    @patch("app.model_manager.download_hf")
     @patch("app.model_manager._looks_like_hf_repo")
     @patch("app.model_manager._convert_hf_to_gguf")
     @patch("app.model_manager._quantize_gguf")
@@ -679,201 +580,229 @@ class TestPrepareModelAndGetPath:
         mock_quantize,
         mock_convert,
         mock_looks_like,
-        mock_download,
-        mock_rename,
-        mock_exists,
-        mock_mkdir,
-        temp_dir,
+        path_mocks,
+        tmp_path,
         mock_models_dir,
     ):
         """Test that quantization happens after conversion with proper workflow."""
 
         # Mock file existence - no current model exists
-        def mock_exists_func(self):
-            return False
+        path_mocks.exists.return_value = False
 
-        # Mock the exists method on Path instances
-        original_exists = Path.exists
-        Path.exists = mock_exists_func
+        # Mock HF repo detection
+        mock_looks_like.return_value = True
 
-        try:
-            # Mock HF repo detection
-            mock_looks_like.return_value = True
+        # Mock conversion and quantization
+        converted_file = tmp_path / "converted.gguf"
+        quantized_file = tmp_path / "converted.Q4_K_M.gguf"
+        mock_convert.return_value = converted_file
+        mock_quantize.return_value = quantized_file
 
-            # Mock conversion and quantization
-            converted_file = temp_dir / "converted.gguf"
-            quantized_file = temp_dir / "converted.Q4_K_M.gguf"
-            mock_convert.return_value = converted_file
-            mock_quantize.return_value = quantized_file
-
-            with patch.dict(
-                "os.environ", {"HF_MODEL_ID": "test/model", "QUANTIZATION": "Q4_K_M"}
-            ):
-                result = prepare_model_and_get_path()
+        with patch.dict(
+            "os.environ", {"HF_MODEL_ID": "test/model", "QUANTIZATION": "Q4_K_M"}
+        ):
+            result = prepare_model_and_get_path()
 
-                # Verify conversion was called first
-                mock_convert.assert_called_once()
+            # Verify conversion was called first
+            mock_convert.assert_called_once()
 
-                # Verify quantization was called with converted file
-                mock_quantize.assert_called_once_with(converted_file, "Q4_K_M")
+            # Verify quantization was called with converted file
+            mock_quantize.assert_called_once_with(converted_file, "Q4_K_M")
 
-                # Verify result is the quantized file
-                assert result == str(quantized_file)
-        finally:
-            Path.exists = original_exists
+            # Verify result is the quantized file
+            assert result == str(quantized_file)
 
     @pytest.mark.unit
-    @patch("pathlib.Path.mkdir")
-    @patch("pathlib.Path.exists")
-    @patch("pathlib.Path.rename")
-    @patch("app.model_manager.download_hf")
     @patch("app.model_manager._looks_like_hf_repo")
     def test_no_usable_model_found_after_download(
         self,
         mock_looks_like,
-        mock_download,
-        mock_rename,
-        mock_exists,
-        mock_mkdir,
+        path_mocks,
         mock_models_dir,
     ):
         """Test error when no usable model is found after download."""
 
         # Mock file existence - no current model exists
-        def mock_exists_func(self):
-            return False
-
-        # Mock the exists method on Path instances
-        original_exists = Path.exists
-        Path.exists = mock_exists_func
+        path_mocks.exists.return_value = False
 
-        try:
-            # Mock HF repo detection - not a valid HF repo
-            mock_looks_like.return_value = False
+        # Mock HF repo detection - not a valid HF repo
+        mock_looks_like.return_value = False
 
-            with patch.dict("os.environ", {"HF_MODEL_ID": "test/model"}):
-                with pytest.raises(RuntimeError, match="No usable model found"):
-                    prepare_model_and_get_path()
-        finally:
-            Path.exists = original_exists
+        with patch.dict("os.environ", {"HF_MODEL_ID": "test/model"}):
+            with pytest.raises(RuntimeError, match="No usable model found"):
+                prepare_model_and_get_path()
 
 
-class TestDetectModelTypeFromS3Uri:
-    """Test the _detect_model_type_from_s3_uri function."""
+class TestDownloadCompleteMarker:
+    """Test resuming from a completed but unpromoted download."""
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_detect_gguf_files(self, mock_boto3_client):
-        """Test detection of GGUF files in S3."""
-        s3_uri = "s3://bucket/gguf-models/"
-
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {
-            "Contents": [
-                {"Key": "gguf-models/model.gguf"},
-                {"Key": "gguf-models/other.txt"},
-            ]
-        }
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_boto3_client.return_value = mock_s3
+    @patch("app.model_manager.download_hf")
+    def test_marker_written_after_download(self, mock_download, tmp_path):
+        """Test that a successful download is marked complete before promotion."""
+        with patch.dict(
+            "os.environ",
+            {"HF_MODEL_ID": "test/model", "MODEL_FILENAME": "model.gguf"},
+        ), patch("app.model_manager.MODELS_DIR", tmp_path):
+            mock_download.side_effect = lambda repo_id, dest_dir, filename: (
+                dest_dir / filename
+            ).touch()
 
-        result = _detect_model_type_from_s3_uri(s3_uri)
-        assert result == "gguf"
-
-    @pytest.mark.unit
-    @patch("boto3.client")
-    def test_detect_safetensors_files(self, mock_boto3_client):
-        """Test detection of safetensors files in S3."""
-        s3_uri = "s3://bucket/safetensors-models/"
-
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {
-            "Contents": [
-                {"Key": "safetensors-models/config.json"},
-                {"Key": "safetensors-models/model.safetensors"},
-            ]
-        }
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_boto3_client.return_value = mock_s3
+            result = prepare_model_and_get_path()
 
-        result = _detect_model_type_from_s3_uri(s3_uri)
-        assert result == "safetensors"
-
-    @pytest.mark.unit
-    @patch("boto3.client")
-    def test_detect_unknown_files(self, mock_boto3_client):
-        """Test detection when no recognizable files are found."""
-        s3_uri = "s3://bucket/unknown-models/"
-
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {
-            "Contents": [
-                {"Key": "unknown-models/README.md"},
-                {"Key": "unknown-models/other.txt"},
-            ]
-        }
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_boto3_client.return_value = mock_s3
+        assert result == str(tmp_path / "current" / "model.gguf")
+        assert (tmp_path / "current" / DOWNLOAD_COMPLETE_MARKER).is_file()
+        assert not (tmp_path / "download").exists()
 
-        result = _detect_model_type_from_s3_uri(s3_uri)
-        assert result == "unknown"
+    @pytest.mark.unit
+    @patch("app.model_manager.shutil.rmtree")
+    @patch("app.model_manager.download_hf")
+    def test_completed_download_is_reused(self, mock_download, mock_rmtree, tmp_path):
+        """Test that a marked download is promoted without re-downloading."""
+        tmp_root = tmp_path / "download"
+        tmp_root.mkdir()
+        (tmp_root / "model.gguf").touch()
+        (tmp_root / DOWNLOAD_COMPLETE_MARKER).touch()
+
+        with patch.dict(
+            "os.environ",
+            {"HF_MODEL_ID": "test/model", "MODEL_FILENAME": "model.gguf"},
+        ), patch("app.model_manager.MODELS_DIR", tmp_path):
+            result = prepare_model_and_get_path()
+
+        assert result == str(tmp_path / "current" / "model.gguf")
+        mock_download.assert_not_called()
+        mock_rmtree.assert_not_called()
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_detect_prefers_gguf_over_safetensors(self, mock_boto3_client):
-        """Test that GGUF is detected first when both types are present."""
-        s3_uri = "s3://bucket/mixed-models/"
-
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {
-            "Contents": [
-                {"Key": "mixed-models/model.gguf"},
-                {"Key": "mixed-models/model.safetensors"},
-            ]
-        }
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_boto3_client.return_value = mock_s3
+    @patch("app.model_manager.download_hf")
+    def test_partial_download_is_discarded(self, mock_download, tmp_path):
+        """Test that an unmarked download directory is cleared and fetched again."""
+        tmp_root = tmp_path / "download"
+        tmp_root.mkdir()
+        (tmp_root / "stale.part").touch()
 
-        result = _detect_model_type_from_s3_uri(s3_uri)
-        assert result == "gguf"
+        with patch.dict(
+            "os.environ",
+            {"HF_MODEL_ID": "test/model", "MODEL_FILENAME": "model.gguf"},
+        ), patch("app.model_manager.MODELS_DIR", tmp_path):
+            mock_download.side_effect = lambda repo_id, dest_dir, filename: (
+                dest_dir / filename
+            ).touch()
+
+            prepare_model_and_get_path()
+
+        mock_download.assert_called_once()
+        assert not (tmp_path / "current" / "stale.part").exists()
+
+
+class TestDetectModelTypeFromS3Uri:
+    """Test the _detect_model_type_from_s3_uri function."""
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_detect_handles_s3_error(self, mock_boto3_client):
+    @pytest.mark.parametrize(
+        "keys,expected",
+        [
+            pytest.param(
+                ["gguf-models/model.gguf", "gguf-models/other.txt"], "gguf", id="gguf"
+            ),
+            pytest.param(
+                [
+                    "safetensors-models/config.json",
+                    "safetensors-models/model.safetensors",
+                ],
+                "safetensors",
+                id="safetensors",
+            ),
+            pytest.param(
+                ["unknown-models/README.md", "unknown-models/other.txt"],
+                "unknown",
+                id="unknown",
+            ),
+            pytest.param(
+                ["hf-models/config.json", "hf-models/pytorch_model.bin"],
+                "safetensors",
+                id="hf_config",
+            ),
+            # GGUF wins over HF-format files in either listing order
+            pytest.param(
+                ["mixed-models/model.gguf", "mixed-models/model.safetensors"],
+                "gguf",
+                id="prefers_gguf",
+            ),
+            pytest.param(
+                ["mixed-models/config.json", "mixed-models/model-q4.gguf"],
+                "gguf",
+                id="prefers_gguf_after_config",
+            ),
+        ],
+    )
+    def test_detect(self, s3_mock, keys, expected):
+        """Test detection of the model type from the listed S3 keys."""
+        s3_mock.set_keys(keys)
+
+        assert _detect_model_type_from_s3_uri("s3://bucket/x/") == expected
+
+    @pytest.mark.unit
+    def test_detect_limits_listing(self, s3_mock):
+        """Test that detection lists a bounded number of keys."""
+        s3_mock.set_keys([])
+
+        _detect_model_type_from_s3_uri("s3://bucket/models/")
+
+        s3_mock.paginator.paginate.assert_called_once_with(
+            Bucket="bucket",
+            Prefix="models/",
+            PaginationConfig={"MaxItems": 100, "PageSize": 100},
+        )
+
+    @pytest.mark.unit
+    def test_detect_reuses_s3_client(self, s3_mock):
+        """Test that the S3 client is created once and reused."""
+        s3_mock.set_keys([])
+
+        _detect_model_type_from_s3_uri("s3://bucket/a/")
+        _detect_model_type_from_s3_uri("s3://bucket/b/")
+
+        s3_mock.boto3_client.assert_called_once_with("s3", config=ANY)
+
+    @pytest.mark.unit
+    def test_detect_caches_result_per_uri(self, s3_mock):
+        """Test that repeat detection of the same URI does not list S3 again."""
+        s3_mock.set_keys(["models/model.gguf"])
+
+        assert _detect_model_type_from_s3_uri("s3://bucket/models/") == "gguf"
+        assert _detect_model_type_from_s3_uri("s3://bucket/models/") == "gguf"
+
+        s3_mock.paginator.paginate.assert_called_once()
+
+    @pytest.mark.unit
+    def test_detect_does_not_cache_errors(self, s3_mock):
+        """Test that a failed detection is retried on the next call."""
+        s3_mock.paginator.paginate.side_effect = [
+            Exception("S3 error"),
+            [{"Contents": [{"Key": "models/model.safetensors"}]}],
+        ]
+
+        assert _detect_model_type_from_s3_uri("s3://bucket/models/") == "unknown"
+        assert _detect_model_type_from_s3_uri("s3://bucket/models/") == "safetensors"
+
+    @pytest.mark.unit
+    def test_detect_handles_s3_error(self, s3_mock):
         """Test handling of S3 errors during detection."""
         s3_uri = "s3://bucket/models/"
 
         # Mock S3 client to raise exception
-        mock_boto3_client.side_effect = Exception("S3 error")
+        s3_mock.boto3_client.side_effect = Exception("S3 error")
 
         result = _detect_model_type_from_s3_uri(s3_uri)
         assert result == "unknown"
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_detect_empty_s3_location(self, mock_boto3_client):
+    def test_detect_empty_s3_location(self, s3_mock):
         """Test detection when S3 location is empty."""
         s3_uri = "s3://bucket/empty/"
-
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {"Contents": []}
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_boto3_client.return_value = mock_s3
+        s3_mock.set_keys([])
 
         result = _detect_model_type_from_s3_uri(s3_uri)
         assert result == "unknown"
@@ -882,36 +811,33 @@ class TestDetectModelTypeFromS3Uri:
 class TestEnvironmentVariables:
     """Test environment variable handling in model manager."""
 
+    @staticmethod
+    def _load_module(env):
+        """Import a private copy of app.model_manager under the given environment.
+
+        The shared module, which other tests patch, is left untouched.
+        """
+        spec = importlib.util.find_spec("app.model_manager")
+        module = importlib.util.module_from_spec(spec)
+        with patch.dict("os.environ", env, clear=True):
+            spec.loader.exec_module(module)
+        return module
+
     @pytest.mark.unit
     def test_models_dir_environment_variable(self):
         """Test MODELS_DIR environment variable."""
-        with patch.dict("os.environ", {"MODELS_DIR": "/custom/models"}):
-            import importlib
-
-            import app.model_manager
-
-            importlib.reload(app.model_manager)
-            assert app.model_manager.MODELS_DIR == Path("/custom/models")
+        module = self._load_module({"MODELS_DIR": "/custom/models"})
+        assert module.MODELS_DIR == Path("/custom/models")
 
     @pytest.mark.unit
     def test_llamacpp_dir_environment_variable(self):
         """Test LLAMACPP_DIR environment variable."""
-        with patch.dict("os.environ", {"LLAMACPP_DIR": "/custom/llama.cpp"}):
-            import importlib
-
-            import app.model_manager
-
-            importlib.reload(app.model_manager)
-            assert app.model_manager.LLAMACPP_DIR == Path("/custom/llama.cpp")
+        module = self._load_module({"LLAMACPP_DIR": "/custom/llama.cpp"})
+        assert module.LLAMACPP_DIR == Path("/custom/llama.cpp")
 
     @pytest.mark.unit
     def test_environment_variables_defaults(self):
         """Test default environment variable values."""
-        with patch.dict("os.environ", {}, clear=True):
-            import importlib
-
-            import app.model_manager
-
-            importlib.reload(app.model_manager)
-            assert app.model_manager.MODELS_DIR == Path("/opt/models")
-            assert app.model_manager.LLAMACPP_DIR == Path("/opt/llama.cpp")
+        module = self._load_module({})
+        assert module.MODELS_DIR == Path("/opt/models")
+        assert module.LLAMACPP_DIR == Path("/opt/llama.cpp")
@@ -11,7 +11,11 @@ from unittest.mock import MagicMock, Mock, patch
 
 import pytest
 
-from app.sources_hf import download_hf
+from app.sources_hf import (
+    _enable_hf_transfer_default,
+    _resolve_hf_token,
+    download_hf,
+)
 
 
 class TestDownloadHf:
@@ -19,10 +23,10 @@ class TestDownloadHf:
 
     @pytest.mark.unit
     @patch("app.sources_hf.snapshot_download")
-    def test_download_hf_full_model_success(self, mock_snapshot_download, temp_dir):
+    def test_download_hf_full_model_success(self, mock_snapshot_download, download_dir):
         """Test successful full model download."""
         repo_id = "test/model"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
 
         # Mock successful download
         mock_snapshot_download.return_value = str(dest_dir)
@@ -34,6 +38,8 @@ class TestDownloadHf:
             repo_id=repo_id,
             local_dir=str(dest_dir),
             token=None,
+            max_workers=8,
+            allow_patterns=None,
         )
 
         # Function returns None
@@ -41,10 +47,10 @@ class TestDownloadHf:
 
     @pytest.mark.unit
     @patch("app.sources_hf.snapshot_download")
-    def test_download_hf_with_token(self, mock_snapshot_download, temp_dir):
+    def test_download_hf_with_token(self, mock_snapshot_download, download_dir):
         """Test download with explicit token."""
         repo_id = "test/model"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
         token = "hf_test_token"
 
         # Mock successful download
@@ -57,6 +63,8 @@ class TestDownloadHf:
             repo_id=repo_id,
             local_dir=str(dest_dir),
             token=token,
+            max_workers=8,
+            allow_patterns=None,
         )
 
         # Function returns None
@@ -64,10 +72,10 @@ class TestDownloadHf:
 
     @pytest.mark.unit
     @patch("app.sources_hf.snapshot_download")
-    def test_download_hf_with_hf_token_env(self, mock_snapshot_download, temp_dir):
+    def test_download_hf_with_hf_token_env(self, mock_snapshot_download, download_dir):
         """Test download with HF_TOKEN environment variable."""
         repo_id = "test/model"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
         token = "hf_env_token"
 
         # Mock successful download
@@ -81,6 +89,8 @@ class TestDownloadHf:
             repo_id=repo_id,
             local_dir=str(dest_dir),
             token=token,
+            max_workers=8,
+            allow_patterns=None,
         )
 
         # Function returns None
@@ -89,11 +99,11 @@ class TestDownloadHf:
     @pytest.mark.unit
     @patch("app.sources_hf.snapshot_download")
     def test_download_hf_with_huggingface_token_env(
-        self, mock_snapshot_download, temp_dir
+        self, mock_snapshot_download, download_dir
     ):
         """Test download with HUGGINGFACE_TOKEN environment variable."""
         repo_id = "test/model"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
         token = "huggingface_env_token"
 
         # Mock successful download
@@ -107,6 +117,8 @@ class TestDownloadHf:
             repo_id=repo_id,
             local_dir=str(dest_dir),
             token=token,
+            max_workers=8,
+            allow_patterns=None,
         )
 
         # Function returns None
@@ -114,10 +126,10 @@ class TestDownloadHf:
 
     @pytest.mark.unit
     @patch("app.sources_hf.snapshot_download")
-    def test_download_hf_token_precedence(self, mock_snapshot_download, temp_dir):
+    def test_download_hf_token_precedence(self, mock_snapshot_download, download_dir):
         """Test that explicit token takes precedence over environment variables."""
         repo_id = "test/model"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
         explicit_token = "explicit_token"
         env_token = "env_token"
 
@@ -134,6 +146,8 @@ class TestDownloadHf:
             repo_id=repo_id,
             local_dir=str(dest_dir),
             token=explicit_token,
+            max_workers=8,
+            allow_patterns=None,
         )
 
         # Function returns None
@@ -142,11 +156,11 @@ class TestDownloadHf:
     @pytest.mark.unit
     @patch("app.sources_hf.snapshot_download")
     def test_download_hf_hf_token_precedence_over_huggingface_token(
-        self, mock_snapshot_download, temp_dir
+        self, mock_snapshot_download, download_dir
     ):
         """Test that HF_TOKEN takes precedence over HUGGINGFACE_TOKEN."""
         repo_id = "test/model"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
         hf_token = "hf_token"
         huggingface_token = "huggingface_token"
 
@@ -163,6 +177,8 @@ class TestDownloadHf:
             repo_id=repo_id,
             local_dir=str(dest_dir),
             token=hf_token,
+            max_workers=8,
+            allow_patterns=None,
         )
 
         # Function returns None
@@ -170,10 +186,10 @@ class TestDownloadHf:
 
     @pytest.mark.unit
     @patch("app.sources_hf.snapshot_download")
-    def test_download_hf_dest_dir_creation(self, mock_snapshot_download, temp_dir):
+    def test_download_hf_dest_dir_creation(self, mock_snapshot_download, tmp_path):
         """Test that destination directory is created if it doesn't exist."""
         repo_id = "test/model"
-        dest_dir = temp_dir / "new" / "download" / "path"
+        dest_dir = tmp_path / "new" / "download" / "path"
 
         # Mock successful download
         mock_snapshot_download.return_value = str(dest_dir)
@@ -185,6 +201,8 @@ class TestDownloadHf:
             repo_id=repo_id,
             local_dir=str(dest_dir),
             token=None,
+            max_workers=8,
+            allow_patterns=None,
         )
 
         # Function returns None
@@ -193,11 +211,11 @@ class TestDownloadHf:
     @pytest.mark.unit
     @patch("app.sources_hf.snapshot_download")
     def test_download_hf_prints_progress(
-        self, mock_snapshot_download, temp_dir, capsys
+        self, mock_snapshot_download, download_dir, capsys
     ):
         """Test that download progress is printed."""
         repo_id = "test/model"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
 
         # Mock successful download
         mock_snapshot_download.return_value = str(dest_dir)
@@ -213,11 +231,11 @@ class TestDownloadHf:
     @pytest.mark.unit
     @patch("app.sources_hf.snapshot_download")
     def test_download_hf_error_prints_message(
-        self, mock_snapshot_download, temp_dir, capsys
+        self, mock_snapshot_download, download_dir, capsys
     ):
         """Test that error messages are printed on download failure."""
         repo_id = "test/model"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
 
         # Mock download failure
         mock_snapshot_download.side_effect = Exception("Test error")
@@ -232,10 +250,12 @@ class TestDownloadHf:
 
     @pytest.mark.unit
     @patch("app.sources_hf.snapshot_download")
-    def test_download_hf_with_complex_repo_id(self, mock_snapshot_download, temp_dir):
+    def test_download_hf_with_complex_repo_id(
+        self, mock_snapshot_download, download_dir
+    ):
         """Test download with complex repository ID."""
         repo_id = "arcee-ai/arcee-lite"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
 
         # Mock successful download
         mock_snapshot_download.return_value = str(dest_dir)
@@ -247,7 +267,84 @@ class TestDownloadHf:
             repo_id=repo_id,
             local_dir=str(dest_dir),
             token=None,
+            max_workers=8,
+            allow_patterns=None,
         )
 
         # Function returns None
         assert result is None
+
+    @pytest.mark.unit
+    @patch("app.sources_hf.snapshot_download")
+    def test_download_hf_respects_allow_patterns_env(
+        self, mock_snapshot_download, download_dir
+    ):
+        """Test that HF_ALLOW_PATTERNS limits the files fetched from the repository."""
+        with patch.dict("os.environ", {"HF_ALLOW_PATTERNS": "*.gguf, tokenizer.json"}):
+            download_hf(repo_id="test/model", dest_dir=download_dir)
+
+        assert mock_snapshot_download.call_args.kwargs["allow_patterns"] == [
+            "*.gguf",
+            "tokenizer.json",
+        ]
+
+    @pytest.mark.unit
+    @patch("app.sources_hf.snapshot_download")
+    def test_download_hf_allow_patterns_argument(
+        self, mock_snapshot_download, download_dir
+    ):
+        """Test that explicit allow_patterns take precedence over HF_ALLOW_PATTERNS."""
+        with patch.dict("os.environ", {"HF_ALLOW_PATTERNS": "*.gguf"}):
+            download_hf(
+                repo_id="test/model",
+                dest_dir=download_dir,
+                allow_patterns=["*.safetensors"],
+            )
+
+        assert mock_snapshot_download.call_args.kwargs["allow_patterns"] == [
+            "*.safetensors"
+        ]
+
+    @pytest.mark.unit
+    @patch("app.sources_hf.snapshot_download")
+    def test_download_hf_workers_from_env(self, mock_snapshot_download, download_dir):
+        """Test that HF_DOWNLOAD_WORKERS sets the snapshot download concurrency."""
+        with patch.dict("os.environ", {"HF_DOWNLOAD_WORKERS": "16"}):
+            download_hf(repo_id="test/model", dest_dir=download_dir)
+
+        assert mock_snapshot_download.call_args.kwargs["max_workers"] == 16
+
+
+class TestResolveHfToken:
+    """Test the _resolve_hf_token function."""
+
+    @pytest.mark.unit
+    def test_resolve_hf_token_is_cached(self):
+        """Test that the environment is read once per explicit token."""
+        with patch.dict("os.environ", {"HF_TOKEN": "first"}):
+            assert _resolve_hf_token(None) == "first"
+        with patch.dict("os.environ", {"HF_TOKEN": "second"}):
+            assert _resolve_hf_token(None) == "first"
+            assert _resolve_hf_token("explicit") == "explicit"
+
+
+class TestHfTransfer:
+    """Test the hf_transfer download default."""
+
+    @pytest.mark.unit
+    def test_hf_transfer_enabled_by_default(self, monkeypatch):
+        """Test that hf_transfer is enabled when the variable is unset."""
+        monkeypatch.delenv("HF_HUB_ENABLE_HF_TRANSFER", raising=False)
+
+        _enable_hf_transfer_default()
+
+        assert os.environ["HF_HUB_ENABLE_HF_TRANSFER"] == "1"
+
+    @pytest.mark.unit
+    def test_hf_transfer_respects_explicit_setting(self, monkeypatch):
+        """Test that an explicit HF_HUB_ENABLE_HF_TRANSFER is left alone."""
+        monkeypatch.setenv("HF_HUB_ENABLE_HF_TRANSFER", "0")
+
+        _enable_hf_transfer_default()
+
+        assert os.environ["HF_HUB_ENABLE_HF_TRANSFER"] == "0"
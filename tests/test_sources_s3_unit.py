@@ -5,12 +5,22 @@ This module contains unit tests for all functions in app.sources_s3.py,
 including S3 URI parsing and model downloading.
 """
 
+import importlib.util
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from unittest.mock import MagicMock, Mock, patch
+from unittest.mock import ANY, MagicMock, call, patch
 
 import pytest
 
-from app.sources_s3 import _parse_s3_uri, download_s3
+from app.sources_s3 import (
+    _TRANSFER_CONFIG,
+    MAX_DOWNLOAD_WORKERS,
+    _parse_s3_uri,
+    _s3_client,
+    download_s3,
+)
 
 
 class TestParseS3Uri:
@@ -89,215 +99,224 @@ class TestDownloadS3:
     """Test the download_s3 function."""
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_download_s3_single_file(self, mock_boto3_client, temp_dir):
+    def test_download_s3_single_file(self, s3_mock, download_dir):
         """Test downloading a single file from S3."""
         s3_uri = "s3://my-bucket/model.gguf"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
 
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {"Contents": [{"Key": "model.gguf"}]}
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_s3.download_file.return_value = None
-        mock_boto3_client.return_value = mock_s3
+        s3_mock.set_keys(["model.gguf"])
 
         download_s3(s3_uri, dest_dir)
 
         # Verify S3 client was called correctly
-        mock_boto3_client.assert_called_once_with("s3")
-        mock_s3.get_paginator.assert_called_once_with("list_objects_v2")
-        mock_paginator.paginate.assert_called_once_with(
-            Bucket="my-bucket", Prefix="model.gguf"
+        s3_mock.boto3_client.assert_called_once_with("s3", config=ANY)
+        config = s3_mock.boto3_client.call_args.kwargs["config"]
+        assert config.max_pool_connections == (
+            MAX_DOWNLOAD_WORKERS * _TRANSFER_CONFIG.max_concurrency
         )
-        mock_s3.download_file.assert_called_once_with(
-            "my-bucket", "model.gguf", str(dest_dir / "model.gguf")
+        assert config.retries == {"max_attempts": 10, "mode": "adaptive"}
+        assert config.tcp_keepalive is True
+        s3_mock.client.get_paginator.assert_called_once_with("list_objects_v2")
+        s3_mock.paginator.paginate.assert_called_once_with(
+            Bucket="my-bucket",
+            Prefix="model.gguf",
+            PaginationConfig={"PageSize": 1000},
+        )
+        s3_mock.client.download_file.assert_called_once_with(
+            "my-bucket",
+            "model.gguf",
+            str(dest_dir / "model.gguf"),
+            Config=_TRANSFER_CONFIG,
         )
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_download_s3_directory(self, mock_boto3_client, temp_dir):
+    def test_download_s3_directory(self, s3_mock, download_dir):
         """Test downloading multiple files from S3 directory."""
         s3_uri = "s3://my-bucket/models/"
-        dest_dir = temp_dir / "download"
-
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {
-            "Contents": [
-                {"Key": "models/config.json"},
-                {"Key": "models/model.safetensors"},
-                {"Key": "models/tokenizer.json"},
-            ]
-        }
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_s3.download_file.return_value = None
-        mock_boto3_client.return_value = mock_s3
+        dest_dir = download_dir
+
+        s3_mock.set_keys(
+            ["models/config.json", "models/model.safetensors", "models/tokenizer.json"]
+        )
 
         download_s3(s3_uri, dest_dir)
 
         # Verify all files were downloaded
-        assert mock_s3.download_file.call_count == 3
+        assert s3_mock.client.download_file.call_count == 3
         expected_calls = [
-            (("my-bucket", "models/config.json", str(dest_dir / "config.json")),),
-            (
-                (
-                    "my-bucket",
-                    "models/model.safetensors",
-                    str(dest_dir / "model.safetensors"),
-                ),
+            call(
+                "my-bucket",
+                "models/config.json",
+                str(dest_dir / "config.json"),
+                Config=_TRANSFER_CONFIG,
+            ),
+            call(
+                "my-bucket",
+                "models/model.safetensors",
+                str(dest_dir / "model.safetensors"),
+                Config=_TRANSFER_CONFIG,
+            ),
+            call(
+                "my-bucket",
+                "models/tokenizer.json",
+                str(dest_dir / "tokenizer.json"),
+                Config=_TRANSFER_CONFIG,
             ),
-            (("my-bucket", "models/tokenizer.json", str(dest_dir / "tokenizer.json")),),
         ]
-        mock_s3.download_file.assert_has_calls(expected_calls, any_order=True)
+        s3_mock.client.download_file.assert_has_calls(expected_calls, any_order=True)
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_download_s3_nested_directory(self, mock_boto3_client, temp_dir):
+    def test_download_s3_nested_directory(self, s3_mock, download_dir):
         """Test downloading from nested S3 directory structure."""
         s3_uri = "s3://my-bucket/models/llama/7b/"
-        dest_dir = temp_dir / "download"
-
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {
-            "Contents": [
-                {"Key": "models/llama/7b/config.json"},
-                {"Key": "models/llama/7b/model-00001-of-00002.safetensors"},
-                {"Key": "models/llama/7b/model-00002-of-00002.safetensors"},
+        dest_dir = download_dir
+
+        s3_mock.set_keys(
+            [
+                "models/llama/7b/config.json",
+                "models/llama/7b/model-00001-of-00002.safetensors",
+                "models/llama/7b/model-00002-of-00002.safetensors",
             ]
-        }
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_s3.download_file.return_value = None
-        mock_boto3_client.return_value = mock_s3
+        )
 
         download_s3(s3_uri, dest_dir)
 
         # Verify files were downloaded with correct relative paths
-        assert mock_s3.download_file.call_count == 3
+        assert s3_mock.client.download_file.call_count == 3
         expected_calls = [
-            (
-                (
-                    "my-bucket",
-                    "models/llama/7b/config.json",
-                    str(dest_dir / "config.json"),
-                ),
+            call(
+                "my-bucket",
+                "models/llama/7b/config.json",
+                str(dest_dir / "config.json"),
+                Config=_TRANSFER_CONFIG,
             ),
-            (
-                (
-                    "my-bucket",
-                    "models/llama/7b/model-00001-of-00002.safetensors",
-                    str(dest_dir / "model-00001-of-00002.safetensors"),
-                ),
+            call(
+                "my-bucket",
+                "models/llama/7b/model-00001-of-00002.safetensors",
+                str(dest_dir / "model-00001-of-00002.safetensors"),
+                Config=_TRANSFER_CONFIG,
             ),
-            (
-                (
-                    "my-bucket",
-                    "models/llama/7b/model-00002-of-00002.safetensors",
-                    str(dest_dir / "model-00002-of-00002.safetensors"),
-                ),
+            call(
+                "my-bucket",
+                "models/llama/7b/model-00002-of-00002.safetensors",
+                str(dest_dir / "model-00002-of-00002.safetensors"),
+                Config=_TRANSFER_CONFIG,
             ),
         ]
-        mock_s3.download_file.assert_has_calls(expected_calls, any_order=True)
+        s3_mock.client.download_file.assert_has_calls(expected_calls, any_order=True)
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_download_s3_no_files_found(self, mock_boto3_client, temp_dir):
+    def test_download_s3_creates_each_subdirectory_once(self, s3_mock, tmp_path):
+        """Test that nested targets get their parent directory created once."""
+        dest_dir = tmp_path / "download"
+        s3_mock.set_keys(
+            [
+                "models/tokenizer/vocab.json",
+                "models/tokenizer/merges.txt",
+                "models/weights/model.safetensors",
+            ]
+        )
+
+        with patch("app.sources_s3.os.makedirs", wraps=os.makedirs) as mock_makedirs:
+            download_s3("s3://my-bucket/models/", dest_dir)
+
+        assert (dest_dir / "tokenizer").is_dir()
+        assert (dest_dir / "weights").is_dir()
+        assert mock_makedirs.call_count == 2
+        s3_mock.client.download_file.assert_any_call(
+            "my-bucket",
+            "models/tokenizer/vocab.json",
+            str(dest_dir / "tokenizer" / "vocab.json"),
+            Config=_TRANSFER_CONFIG,
+        )
+
+    @pytest.mark.unit
+    def test_download_s3_no_files_found(self, s3_mock, download_dir):
         """Test error handling when no files are found in S3."""
         s3_uri = "s3://my-bucket/empty-directory/"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
 
-        # Mock S3 client with no contents
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {"Contents": []}
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_boto3_client.return_value = mock_s3
+        s3_mock.set_keys([])
 
         with pytest.raises(ValueError, match="No files found in S3 URI"):
             download_s3(s3_uri, dest_dir)
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_download_s3_only_directories(self, mock_boto3_client, temp_dir):
+    def test_download_s3_only_directories(self, s3_mock, download_dir):
         """Test handling when S3 contains only directories (no files)."""
         s3_uri = "s3://my-bucket/directories-only/"
-        dest_dir = temp_dir / "download"
-
-        # Mock S3 client with only directory objects
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {
-            "Contents": [
-                {"Key": "directories-only/subdir1/"},
-                {"Key": "directories-only/subdir2/"},
-            ]
-        }
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_boto3_client.return_value = mock_s3
+        dest_dir = download_dir
+
+        s3_mock.set_keys(["directories-only/subdir1/", "directories-only/subdir2/"])
 
         with pytest.raises(ValueError, match="No files found in S3 URI"):
             download_s3(s3_uri, dest_dir)
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_download_s3_download_failure(self, mock_boto3_client, temp_dir):
+    def test_download_s3_download_failure(self, s3_mock, download_dir):
         """Test error handling when S3 download fails."""
         s3_uri = "s3://my-bucket/model.gguf"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
 
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {"Contents": [{"Key": "model.gguf"}]}
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_s3.download_file.side_effect = Exception("S3 download failed")
-        mock_boto3_client.return_value = mock_s3
+        s3_mock.set_keys(["model.gguf"])
+        s3_mock.client.download_file.side_effect = Exception("S3 download failed")
 
         with pytest.raises(Exception, match="S3 download failed"):
             download_s3(s3_uri, dest_dir)
+        s3_mock.client.download_file.assert_called_once_with(
+            "my-bucket",
+            "model.gguf",
+            str(dest_dir / "model.gguf"),
+            Config=_TRANSFER_CONFIG,
+        )
+
+    @pytest.mark.unit
+    def test_transfer_config_concurrency_from_env(self):
+        """Test that S3_MULTIPART_CONCURRENCY sets the per-object concurrency."""
+        # Load a private copy so the shared module and its client cache are untouched
+        spec = importlib.util.find_spec("app.sources_s3")
+        module = importlib.util.module_from_spec(spec)
+        with patch.dict("os.environ", {"S3_MULTIPART_CONCURRENCY": "16"}):
+            spec.loader.exec_module(module)
+
+        assert module._TRANSFER_CONFIG.max_concurrency == 16
+        assert module._TRANSFER_CONFIG.multipart_chunksize == 8 * 1024 * 1024
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_download_s3_list_objects_failure(self, mock_boto3_client, temp_dir):
+    def test_download_s3_directory_download_failure(self, s3_mock, download_dir):
+        """Test that a failure in one concurrent download is raised."""
+        s3_uri = "s3://my-bucket/models/"
+        dest_dir = download_dir
+
+        s3_mock.set_keys(["models/config.json", "models/model.safetensors"])
+
+        def fail_on_weights(bucket, key, target, Config=None):
+            if key.endswith(".safetensors"):
+                raise Exception("S3 download failed")
+
+        s3_mock.client.download_file.side_effect = fail_on_weights
+
+        with pytest.raises(Exception, match="S3 download failed"):
+            download_s3(s3_uri, dest_dir)
+
+    @pytest.mark.unit
+    def test_download_s3_list_objects_failure(self, s3_mock, download_dir):
         """Test error handling when listing S3 objects fails."""
         s3_uri = "s3://my-bucket/model.gguf"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
 
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_paginator.paginate.side_effect = Exception("List objects failed")
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_boto3_client.return_value = mock_s3
+        s3_mock.paginator.paginate.side_effect = Exception("List objects failed")
 
         with pytest.raises(Exception, match="List objects failed"):
             download_s3(s3_uri, dest_dir)
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_download_s3_creates_dest_dir(self, mock_boto3_client, temp_dir):
+    def test_download_s3_creates_dest_dir(self, s3_mock, tmp_path):
         """Test that destination directory is created if it doesn't exist."""
         s3_uri = "s3://my-bucket/model.gguf"
-        dest_dir = temp_dir / "new" / "download" / "path"
+        dest_dir = tmp_path / "new" / "download" / "path"
 
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {"Contents": [{"Key": "model.gguf"}]}
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_s3.download_file.return_value = None
-        mock_boto3_client.return_value = mock_s3
+        s3_mock.set_keys(["model.gguf"])
 
         download_s3(s3_uri, dest_dir)
 
@@ -306,170 +325,207 @@ class TestDownloadS3:
         assert dest_dir.is_dir()
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_download_s3_prints_progress(self, mock_boto3_client, temp_dir, capsys):
+    def test_download_s3_prints_progress(self, s3_mock, download_dir, capsys):
         """Test that download progress is printed."""
         s3_uri = "s3://my-bucket/models/"
-        dest_dir = temp_dir / "download"
-
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {
-            "Contents": [
-                {"Key": "models/config.json"},
-                {"Key": "models/model.safetensors"},
-            ]
-        }
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_s3.download_file.return_value = None
-        mock_boto3_client.return_value = mock_s3
+        dest_dir = download_dir
+
+        s3_mock.set_keys(["models/config.json", "models/model.safetensors"])
 
         download_s3(s3_uri, dest_dir)
 
         captured = capsys.readouterr()
-        assert "Downloading from S3: bucket=my-bucket, prefix=models/" in captured.out
+        assert "Downloading model from S3: s3://my-bucket/models/" in captured.out
         assert "Found 2 object(s) to download" in captured.out
         assert "Downloading 2 files to directory structure" in captured.out
         assert "Successfully downloaded all files" in captured.out
 
     @pytest.mark.unit
-    @patch("boto3.client")
+    def test_download_s3_prints_progress_per_interval(
+        self, s3_mock, download_dir, capsys
+    ):
+        """Test that prefix downloads report progress in batches, not per file."""
+        s3_mock.set_keys([f"models/file_{i:03d}.txt" for i in range(250)])
+
+        download_s3("s3://my-bucket/models/", download_dir)
+
+        out = capsys.readouterr().out
+        assert "Downloading models/" not in out
+        assert "Downloaded 100/250 files" in out
+        assert "Downloaded 200/250 files" in out
+        assert "Downloaded 250/250 files" in out
+        assert out.count("Downloaded ") == 3
+
+    @pytest.mark.unit
     def test_download_s3_single_file_prints_progress(
-        self, mock_boto3_client, temp_dir, capsys
+        self, s3_mock, download_dir, capsys
     ):
         """Test that single file download progress is printed."""
         s3_uri = "s3://my-bucket/model.gguf"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
 
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {"Contents": [{"Key": "model.gguf"}]}
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_s3.download_file.return_value = None
-        mock_boto3_client.return_value = mock_s3
+        s3_mock.set_keys(["model.gguf"])
 
         download_s3(s3_uri, dest_dir)
 
         captured = capsys.readouterr()
-        assert (
-            "Downloading from S3: bucket=my-bucket, prefix=model.gguf" in captured.out
-        )
+        assert "Downloading model from S3: s3://my-bucket/model.gguf" in captured.out
         assert "Found 1 object(s) to download" in captured.out
         assert "Downloading single file to:" in captured.out
         assert "Successfully downloaded:" in captured.out
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_download_s3_with_special_characters_in_keys(
-        self, mock_boto3_client, temp_dir
-    ):
+    def test_download_s3_with_special_characters_in_keys(self, s3_mock, download_dir):
         """Test downloading files with special characters in S3 keys."""
         s3_uri = "s3://my-bucket/models/"
-        dest_dir = temp_dir / "download"
-
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {
-            "Contents": [
-                {"Key": "models/file with spaces.txt"},
-                {"Key": "models/file-with-dashes.json"},
-                {"Key": "models/file_with_underscores.gguf"},
+        dest_dir = download_dir
+
+        s3_mock.set_keys(
+            [
+                "models/file with spaces.txt",
+                "models/file-with-dashes.json",
+                "models/file_with_underscores.gguf",
             ]
-        }
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_s3.download_file.return_value = None
-        mock_boto3_client.return_value = mock_s3
+        )
 
         download_s3(s3_uri, dest_dir)
 
         # Verify files were downloaded with correct names
         expected_calls = [
-            (
-                (
-                    "my-bucket",
-                    "models/file with spaces.txt",
-                    str(dest_dir / "file with spaces.txt"),
-                ),
+            call(
+                "my-bucket",
+                "models/file with spaces.txt",
+                str(dest_dir / "file with spaces.txt"),
+                Config=_TRANSFER_CONFIG,
             ),
-            (
-                (
-                    "my-bucket",
-                    "models/file-with-dashes.json",
-                    str(dest_dir / "file-with-dashes.json"),
-                ),
+            call(
+                "my-bucket",
+                "models/file-with-dashes.json",
+                str(dest_dir / "file-with-dashes.json"),
+                Config=_TRANSFER_CONFIG,
             ),
-            (
-                (
-                    "my-bucket",
-                    "models/file_with_underscores.gguf",
-                    str(dest_dir / "file_with_underscores.gguf"),
-                ),
+            call(
+                "my-bucket",
+                "models/file_with_underscores.gguf",
+                str(dest_dir / "file_with_underscores.gguf"),
+                Config=_TRANSFER_CONFIG,
             ),
         ]
-        mock_s3.download_file.assert_has_calls(expected_calls, any_order=True)
+        s3_mock.client.download_file.assert_has_calls(expected_calls, any_order=True)
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_download_s3_handles_empty_prefix(self, mock_boto3_client, temp_dir):
+    def test_download_s3_handles_empty_prefix(self, s3_mock, download_dir):
         """Test downloading from S3 bucket root."""
         s3_uri = "s3://my-bucket"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
 
-        # Mock S3 client
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-        mock_page = {"Contents": [{"Key": "model.gguf"}]}
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_s3.download_file.return_value = None
-        mock_boto3_client.return_value = mock_s3
+        s3_mock.set_keys(["model.gguf"])
 
         download_s3(s3_uri, dest_dir)
 
         # Verify the download was called correctly
-        mock_s3.download_file.assert_called_once_with(
-            "my-bucket", "model.gguf", str(dest_dir / "model.gguf")
+        s3_mock.client.download_file.assert_called_once_with(
+            "my-bucket",
+            "model.gguf",
+            str(dest_dir / "model.gguf"),
+            Config=_TRANSFER_CONFIG,
         )
 
     @pytest.mark.unit
-    @patch("boto3.client")
-    def test_download_s3_handles_large_number_of_files(
-        self, mock_boto3_client, temp_dir
-    ):
+    def test_download_s3_handles_large_number_of_files(self, s3_mock, download_dir):
         """Test downloading a large number of files from S3."""
         s3_uri = "s3://my-bucket/models/"
-        dest_dir = temp_dir / "download"
+        dest_dir = download_dir
 
-        # Mock S3 client with many files
-        mock_s3 = Mock()
-        mock_paginator = Mock()
-
-        # Create many mock files
-        files = [{"Key": f"models/file_{i:04d}.txt"} for i in range(100)]
-        mock_page = {"Contents": files}
-        mock_paginator.paginate.return_value = [mock_page]
-        mock_s3.get_paginator.return_value = mock_paginator
-        mock_s3.download_file.return_value = None
-        mock_boto3_client.return_value = mock_s3
+        s3_mock.set_keys([f"models/file_{i:04d}.txt" for i in range(100)])
 
         download_s3(s3_uri, dest_dir)
 
         # Verify all files were downloaded
-        assert mock_s3.download_file.call_count == 100
+        assert s3_mock.client.download_file.call_count == 100
 
         # Verify a few specific calls
-        mock_s3.download_file.assert_any_call(
-            "my-bucket", "models/file_0000.txt", str(dest_dir / "file_0000.txt")
+        s3_mock.client.download_file.assert_any_call(
+            "my-bucket",
+            "models/file_0000.txt",
+            str(dest_dir / "file_0000.txt"),
+            Config=_TRANSFER_CONFIG,
+        )
+        s3_mock.client.download_file.assert_any_call(
+            "my-bucket",
+            "models/file_0099.txt",
+            str(dest_dir / "file_0099.txt"),
+            Config=_TRANSFER_CONFIG,
+        )
+
+    @pytest.mark.unit
+    def test_download_s3_starts_before_listing_completes(self, s3_mock, download_dir):
+        """Test that downloads begin while later listing pages are pending."""
+        first_download = threading.Event()
+        overlapped = []
+
+        def pages(**kwargs):
+            yield {"Contents": [{"Key": "models/a.txt"}, {"Key": "models/b.txt"}]}
+            # Only returns True if a download ran before this page was requested
+            overlapped.append(first_download.wait(timeout=5))
+            yield {"Contents": [{"Key": "models/c.txt"}]}
+
+        s3_mock.paginator.paginate.side_effect = pages
+        s3_mock.client.download_file.side_effect = (
+            lambda *args, **kwargs: first_download.set()
         )
-        mock_s3.download_file.assert_any_call(
-            "my-bucket", "models/file_0099.txt", str(dest_dir / "file_0099.txt")
+
+        download_s3("s3://my-bucket/models/", download_dir)
+
+        s3_mock.paginator.paginate.assert_called_once_with(
+            Bucket="my-bucket",
+            Prefix="models/",
+            PaginationConfig={"PageSize": 1000},
         )
+        assert overlapped == [True]
+        assert s3_mock.client.download_file.call_count == 3
+
+    @pytest.mark.unit
+    def test_client_pool_covers_download_workers(self, s3_mock):
+        """Test that every concurrent ranged GET can hold a pooled connection."""
+        with patch.dict("os.environ", {"S3_DOWNLOAD_WORKERS": "64"}):
+            _s3_client()
+
+        config = s3_mock.boto3_client.call_args.kwargs["config"]
+        assert config.max_pool_connections >= 64 * _TRANSFER_CONFIG.max_concurrency
+
+    @pytest.mark.unit
+    def test_download_s3_cancels_queued_downloads_on_error(self, s3_mock, download_dir):
+        """Test that a failed download cancels transfers that have not started."""
+        s3_mock.set_keys([f"models/file_{i}.txt" for i in range(20)])
+        slow = threading.Event()
+
+        def download_file(bucket, key, target, Config=None):
+            if key == "models/file_0.txt":
+                raise Exception("Access denied")
+            # Keep later transfers queued while the failure is handled
+            slow.wait(0.5)
+
+        s3_mock.client.download_file.side_effect = download_file
+
+        with patch.dict("os.environ", {"S3_DOWNLOAD_WORKERS": "1"}):
+            with pytest.raises(Exception, match="Access denied"):
+                download_s3("s3://my-bucket/models/", download_dir)
+
+        assert s3_mock.client.download_file.call_count < 20
+
+    @pytest.mark.unit
+    def test_download_s3_workers_from_env(self, s3_mock, download_dir):
+        """Test that S3_DOWNLOAD_WORKERS bounds the download thread pool."""
+        s3_mock.set_keys([f"models/file_{i}.txt" for i in range(10)])
+
+        with patch.dict("os.environ", {"S3_DOWNLOAD_WORKERS": "4"}), patch(
+            "app.sources_s3.ThreadPoolExecutor", wraps=ThreadPoolExecutor
+        ) as mock_executor:
+            download_s3("s3://my-bucket/models/", download_dir)
+
+        mock_executor.assert_called_once_with(max_workers=4)
+        assert s3_mock.client.download_file.call_count == 10
 
 
 class TestS3UriEdgeCases: